@@ -1,22 +1,42 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
-from io import StringIO, BytesIO
+import warnings
+
+# matplotlib is imported lazily, only when a chart is actually rendered.
+from sondage.allocation import AllocationError, allocate_frame, empty_strata
+from sondage.batch import design_grid, run_batch, write_batch
+from sondage.design import draw
+from sondage.estimation import SingletonStrataWarning, ht_means, ht_totals, singleton_strata
+from sondage.frame import DEFAULT_FRAME_PATH, frame_version, load_frame
+from sondage.instrument import Profiler, configure_logging, stage, write_prometheus
+from sondage.multistage import LEVEL_NAMES, Stage, build_hierarchy_index, draw_multistage, variance_design
+from sondage.profile import load_profile
+from sondage.results import DrawKey, ResultStore, write_csv, write_parquet
+from sondage.replication import replicate_estimates, replication_summary
+from sondage.sampling import PI_COLUMN, build_pps_frame, build_stratum_index
+from sondage.tables import allocation_report, comparison_table, descriptive_stats
+
+# Singleton strata are reported in the page by `warn_singleton_strata`; the library warning would only repeat it.
+warnings.simplefilter("ignore", SingletonStrataWarning)
 
 # --- 1. Data Loading & Preparation ---
-@st.cache_data
-def load_data(file_path="Cadre Tunisie.csv"): # <--- MODIFIED HERE
-    """Loads the CSV data into a pandas DataFrame."""
+@st.cache_resource
+def _load_frame_cached(file_path, version):
+    """Reads the typed columnar store once per source version and shares it across sessions."""
+    with warnings.catch_warnings(record=True) as caught:
+        warnings.simplefilter("always")
+        df = load_frame(file_path)
+    for w in caught:
+        st.warning(str(w.message))
+    return df
+
+def load_data(file_path=DEFAULT_FRAME_PATH):
+    """Loads the sampling frame (categorical hierarchy, narrow numeric dtypes)."""
     try:
-        # Attempt to load with utf-8 encoding first, common for diverse text data
-        try:
-            df = pd.read_csv(file_path, encoding='utf-8')
-        except UnicodeDecodeError:
-            # If utf-8 fails, try latin1, another common encoding
-            st.warning(f"UTF-8 decoding failed for {file_path}. Trying 'latin1' encoding.")
-            df = pd.read_csv(file_path, encoding='latin1')
+        with stage("load_data") as timer:
+            df = _load_frame_cached(file_path, frame_version(file_path))
+            timer.rows = len(df)
         return df
     except FileNotFoundError:
         st.error(f"Error: The file '{file_path}' was not found. Make sure it's in the root directory of your GitHub repository along with your app.py.")
@@ -25,15 +45,148 @@ def load_data(file_path="Cadre Tunisie.csv"): # <--- MODIFIED HERE
         st.error(f"An error occurred while loading the file '{file_path}': {e}")
         return None
 
-# --- Helper function to make data downloadable ---
-def to_csv(df_to_download):
-    if isinstance(df_to_download.index, pd.MultiIndex):
-        csv_data = df_to_download.reset_index().to_csv(index=False).encode('utf-8')
-    elif df_to_download.index.name is not None or not isinstance(df_to_download.index, pd.RangeIndex):
-         csv_data = df_to_download.reset_index().to_csv(index=False).encode('utf-8')
-    else:
-        csv_data = df_to_download.to_csv(index=False).encode('utf-8')
-    return csv_data
+@st.cache_resource
+def frame_profile(_df, file_path, version):
+    """Cardinalities, dtypes, info/describe and frame proportions, computed once per frame version."""
+    return load_profile(_df, file_path, version)
+
+@st.cache_resource
+def stratum_index(_df, version, strat_var):
+    """Row positions grouped by stratum, built once per frame version and stratification variable."""
+    return build_stratum_index(_df, strat_var)
+
+@st.cache_resource
+def pps_frame(_df, version, strat_var):
+    """Ordered sizes and running totals of pop_block, built once per frame version and stratification variable."""
+    return build_pps_frame(_df, size_col='pop_block', strat_var=strat_var)
+
+@st.cache_resource
+def hierarchy_index(_df, version):
+    """GOUV -> DELEG -> SECTOR -> BLOCK index with aggregated pop_block, built once per frame version."""
+    return build_hierarchy_index(_df)
+
+# --- Performance instrumentation ---
+@st.cache_resource
+def perf_logging():
+    """Stage records go to stderr as JSON lines (once per process)."""
+    return configure_logging()
+
+def show_performance(perf):
+    """Stages of the current run (wall/CPU time, peak memory, rows); also refreshes the Prometheus file if configured."""
+    with st.expander("Performance"):
+        st.checkbox("Mesurer le pic mémoire (tracemalloc, plus lent)", key="perf_memory")
+        records = perf.to_frame()
+        if records.empty:
+            st.write("Aucune étape mesurée pendant cette exécution.")
+        else:
+            st.dataframe(records)
+    write_prometheus()
+
+# --- Results cache and lazy downloads ---
+@st.cache_resource
+def result_store():
+    """Draw results shared across sessions, keyed by DrawKey, with their download files."""
+    return ResultStore(maxsize=32)
+
+def show_results(state_key, result_key, clicked):
+    """Remembers the last generated design of a method so its results survive reruns (downloads, widgets)."""
+    if clicked:
+        st.session_state[state_key] = result_key
+    return st.session_state.get(state_key) == result_key
+
+def lazy_download(result_key, label, file_name, mime, write):
+    """Download button whose file is only written (by `write(path)`) when first requested, then memoized."""
+    store = result_store()
+    path = store.artifact_path(result_key, file_name)
+    if path is None and st.button(f"Préparer : {label}", key=f"prepare_{file_name}"):
+        with stage("export", file=file_name):
+            path = store.artifact(result_key, file_name, write)
+        if path is None:
+            st.info("Ce résultat a quitté le cache entre-temps : générez-le à nouveau pour le télécharger.")
+    if path is not None:
+        try:
+            with open(path, 'rb') as fh:
+                st.download_button(label=label, data=fh, file_name=file_name, mime=mime, key=f"download_{file_name}")
+        except FileNotFoundError:
+            # Deleted by the eviction of this result (e.g. from another session).
+            st.info("Ce résultat a quitté le cache entre-temps : générez-le à nouveau pour le télécharger.")
+
+def download_csv(result_key, label, file_name, df_to_download):
+    lazy_download(result_key, label, file_name, 'text/csv', lambda path: write_csv(df_to_download, path))
+
+def download_sample(result_key, sample, name, label):
+    """CSV and Parquet downloads of a drawn sample."""
+    download_csv(result_key, f"Télécharger {label} (CSV)", f'{name}.csv', sample)
+    lazy_download(
+        result_key, f"Télécharger {label} (Parquet)", f'{name}.parquet',
+        'application/octet-stream', lambda path: write_parquet(sample, path)
+    )
+
+# --- Helpers for the weighted (Horvitz-Thompson) estimates ---
+HT_VARIABLES = ['pop_block', 'Lodging']
+DOMAIN_OPTIONS = ["Aucun", "Region", "GOVERNORATE", "Area"]
+
+def domain_selectbox(key):
+    """Sidebar choice of the estimation domain (None for overall estimates only)."""
+    choice = st.sidebar.selectbox("Domaine d'estimation (HT):", DOMAIN_OPTIONS, key=key)
+    return None if choice == "Aucun" else choice
+
+MIN_PER_STRATUM_OPTIONS = {"Aucun": 0, "1 bloc": 1, "2 blocs (variance estimable)": 2}
+
+def min_per_stratum_selectbox(key):
+    """Sidebar choice of the minimum number of blocks per stratum (2 lets every stratum contribute to the SE)."""
+    label = st.sidebar.selectbox("Minimum de blocs par strate:", list(MIN_PER_STRATUM_OPTIONS), key=key)
+    return MIN_PER_STRATUM_OPTIONS[label]
+
+def warn_empty_strata(allocation):
+    """Warns that strata allocated no block are missing from the sample and from the HT estimates."""
+    empty = empty_strata(allocation)
+    if len(empty):
+        st.warning(
+            f"{len(empty)} strate(s) sur {len(allocation)} n'ont reçu aucun bloc (n_h = 0) : elles sont absentes "
+            "de l'échantillon et les estimations HT les omettent (biais). Augmentez n ou choisissez un "
+            "« Minimum de blocs par strate »."
+        )
+
+def warn_singleton_strata(sample, strata, clusters=None):
+    """Warns that strata with a single sampled unit are left out of the variance (SE and CI too small)."""
+    singletons = singleton_strata(sample, strata, clusters)
+    if len(singletons):
+        st.warning(
+            f"{len(singletons)} strate(s) n'ont qu'une seule unité tirée : leur variance ne peut pas être estimée "
+            "et est omise, les erreurs-types et intervalles de confiance sont donc sous-estimés. Choisissez "
+            "« 2 blocs (variance estimable) » comme minimum par strate."
+        )
+
+def show_ht_estimates(sample, strata, domain, result_key, key, clusters=None):
+    """Displays HT totals and means (with SE and 95% CI) overall and, optionally, by domain."""
+    warn_singleton_strata(sample, strata, clusters)
+    with stage("ht_estimates", rows=len(sample)):
+        estimates = pd.concat({
+            'Total': ht_totals(sample, HT_VARIABLES, strata=strata, clusters=clusters),
+            'Moyenne par bloc': ht_means(sample, HT_VARIABLES, strata=strata, clusters=clusters),
+        }, names=['Paramètre'])
+    st.dataframe(estimates)
+    download_csv(
+        result_key,
+        "Télécharger Estimations HT (CSV)",
+        f'estimations_ht_{key}.csv',
+        estimates
+    )
+    if domain is not None:
+        st.write(f"Estimations par domaine : {domain}")
+        with stage("ht_estimates", rows=len(sample), domain=domain):
+            domain_estimates = pd.concat({
+                'Total': ht_totals(sample, HT_VARIABLES, strata=strata, domain=domain, clusters=clusters),
+                'Moyenne par bloc': ht_means(sample, HT_VARIABLES, strata=strata, domain=domain, clusters=clusters),
+            }, names=['Paramètre'])
+        st.dataframe(domain_estimates)
+        download_csv(
+            result_key,
+            f"Télécharger Estimations HT par {domain} (CSV)",
+            f'estimations_ht_{key}_{domain}.csv',
+            domain_estimates
+        )
 
 # --- Main part of the Streamlit app ---
 st.set_page_config(page_title="Application de Théorie de Sondage", layout="wide") # Optional: Set page config
@@ -51,21 +204,26 @@ basé sur les blocs du recensement Tunisien.
 
 **Fonctionnalités Principales :**
 1.  **Chargement de Données :** L'application charge un cadre de sondage prédéfini (`Cadre Tunisie.csv`).
-2.  **Deux Méthodes d'Échantillonnage :**
+2.  **Six Méthodes d'Échantillonnage et d'Évaluation :**
     *   **SAS (Aléatoire Simple Sans Remise) :**
         *   Permet de sélectionner aléatoirement un nombre spécifié d'unités (blocs) du cadre, où chaque unité a une chance égale d'être choisie.
         *   Utile pour obtenir un aperçu général lorsque la population est supposée homogène.
         *   L'application fournit l'échantillon, des statistiques descriptives, et une comparaison (tableau et graphique) avec le cadre de sondage pour une variable choisie.
-    *   **Stratifié (Allocation Proportionnelle) :**
+    *   **Stratifié (Allocation Proportionnelle, Égale ou de Neyman) :**
         *   Divise la population en sous-groupes (strates) basés sur une variable de stratification choisie (Région, Gouvernorat, Délégation).
-        *   Tire ensuite un échantillon de chaque strate proportionnellement à la taille de cette strate par rapport à la population totale (basée sur `pop_block`).
+        *   Tire ensuite un échantillon de chaque strate selon l'allocation choisie (par défaut proportionnellement à la population `pop_block` de la strate).
         *   Assure une meilleure représentation des différents sous-groupes dans l'échantillon.
         *   L'application fournit le tableau d'allocation, l'échantillon stratifié et ses statistiques descriptives.
+    *   **PPS Systématique :** sélection des blocs avec une probabilité proportionnelle à leur population (`pop_block`), éventuellement à l'intérieur de strates.
+    *   **Plan à Plusieurs Degrés (Grappes) :** tirage d'unités géographiques (secteurs ou délégations) puis de blocs dans les unités retenues.
+    *   **Comparaison de Plans (Lot) :** tirage en parallèle d'une grille de plans (méthode × strate × n × graine) et tableaux consolidés pour les comparer.
+    *   **Évaluation Monte Carlo (Réplications) :** distribution des estimations sur de nombreux échantillons répétés et effet de plan par rapport au SAS.
+    *   Chaque échantillon est accompagné d'estimations pondérées de Horvitz-Thompson (totaux, moyennes, intervalles de confiance).
 3.  **Interactivité :** L'utilisateur peut spécifier la taille de l'échantillon et les variables pertinentes pour chaque méthode.
 4.  **Téléchargement des Résultats :** Tous les tableaux et graphiques générés peuvent être téléchargés.
 
 **Objectif du Projet :**
-Développer une application permettant de tirer automatiquement un échantillon de taille *n* selon les méthodes SAS et Stratifiée à allocation proportionnelle.
+Développer une application permettant de tirer automatiquement un échantillon de taille *n* selon différents plans de sondage (SAS, stratifié, PPS, à plusieurs degrés) et d'en évaluer la précision.
 
 **Base d'échantillonnage :** Cadre d'échantillonnage basé sur la division du territoire Tunisien en blocs conçus à partir du dernier recensement général de la population. Chaque bloc représente une unité géographique relativement homogène, de petite taille, comprenant en moyenne 120 ménages.
 
@@ -73,33 +231,37 @@ Utilisez la barre latérale à gauche pour sélectionner une méthode d'échanti
 """)
 st.markdown("---")
 
+# Stages of this run are timed; see the "Performance" expander at the bottom of the page.
+perf_logging()
+perf = Profiler(memory=st.session_state.get("perf_memory", False)).activate()
+
 # Load the data
 df_frame = load_data()
 
 if df_frame is not None:
+    frame_key = frame_version(DEFAULT_FRAME_PATH)
+    profile = frame_profile(df_frame, DEFAULT_FRAME_PATH, frame_key)
+
     # Display initial data summary if desired (can be behind an expander)
     with st.expander("Afficher les détails du cadre de sondage initial"):
         st.subheader("Aperçu du Cadre de Sondage (Premières lignes)")
         st.dataframe(df_frame.head())
 
         st.subheader("Informations sur le Cadre de Sondage")
-        buffer = StringIO()
-        df_frame.info(buf=buffer)
-        s = buffer.getvalue()
-        st.text(s)
+        st.text(profile.info)
 
         st.subheader("Statistiques Descriptives Initiales (Variables Numériques du Cadre)")
-        st.dataframe(df_frame.describe())
+        st.dataframe(profile.describe)
 
         st.subheader("Dimensions du Cadre de Sondage")
-        st.write(f"Nombre de blocs (lignes) : {df_frame.shape[0]}")
-        st.write(f"Nombre de variables (colonnes) : {df_frame.shape[1]}")
+        st.write(f"Nombre de blocs (lignes) : {profile.shape[0]}")
+        st.write(f"Nombre de variables (colonnes) : {profile.shape[1]}")
 
     # --- SAMPLING METHOD SELECTION AND LOGIC ---
     st.sidebar.header("Méthode d'Échantillonnage")
     sampling_method = st.sidebar.selectbox(
         "Choisir la méthode:",
-        ["--Select--", "SAS (Aléatoire Simple Sans Remise)", "Stratifié (Allocation Proportionnelle)"]
+        ["--Select--", "SAS (Aléatoire Simple Sans Remise)", "Stratifié (Allocation Proportionnelle)", "PPS Systématique (Taille pop_block)", "Plan à Plusieurs Degrés (Grappes)", "Comparaison de Plans (Lot)", "Évaluation Monte Carlo (Réplications)"]
     )
 
     # ... (Rest of your SAS and Stratified sampling code remains the same as before) ...
@@ -120,11 +282,7 @@ if df_frame is not None:
             key="n_sas_input"
         )
 
-        potential_comp_vars = [col for col in df_frame.columns
-                               if (df_frame[col].nunique() < 50 or df_frame[col].dtype == 'object') and
-                               col not in ['CODE GOUV', 'CODE DELEG', 'CODE SECTOR', 'CODE BLOCK', 'Block', 'Cumulative population']]
-        if not potential_comp_vars:
-            potential_comp_vars = ['Area']
+        potential_comp_vars = profile.comparison_candidates
 
         comp_var_sas_default_index = potential_comp_vars.index('Area') if 'Area' in potential_comp_vars else 0
         comp_var_sas = st.sidebar.selectbox(
@@ -133,91 +291,81 @@ if df_frame is not None:
             index=comp_var_sas_default_index,
             key="comp_var_sas_select"
         )
+        domain_sas = domain_selectbox("domain_sas_select")
 
-        if st.sidebar.button("Générer l'échantillon SAS", key="sas_button"):
+        sas_key = DrawKey(frame_key, "sas", int(n_sas), seed=42)
+        if show_results("active_sas", sas_key, st.sidebar.button("Générer l'échantillon SAS", key="sas_button")):
             if n_sas > len(df_frame):
                 st.error(f"La taille de l'échantillon ({n_sas}) ne peut pas dépasser la taille de la population ({len(df_frame)}).")
             else:
-                sample_sas = df_frame.sample(n=n_sas, replace=False, random_state=42)
+                with stage("draw", rows=n_sas, method="sas"):
+                    sample_sas, _ = result_store().get_or_compute(sas_key, lambda: draw(df_frame, "sas", n_sas, seed=42))
 
                 st.subheader("1. Échantillon SAS")
                 st.dataframe(sample_sas)
-                st.download_button(
-                    label="Télécharger l'échantillon SAS (CSV)",
-                    data=to_csv(sample_sas),
-                    file_name='echantillon_sas.csv',
-                    mime='text/csv',
-                    key='download_sample_sas'
-                )
+                download_sample(sas_key, sample_sas, 'echantillon_sas', "l'échantillon SAS")
 
                 st.subheader("2. Statistiques Descriptives (Échantillon SAS)")
-                numeric_cols_for_desc_sas = sample_sas.select_dtypes(include=np.number).columns.tolist()
-                numeric_cols_for_desc_sas = [col for col in numeric_cols_for_desc_sas if not col.startswith('CODE')]
-                if 'Cumulative population' in numeric_cols_for_desc_sas:
-                    numeric_cols_for_desc_sas.remove('Cumulative population')
-
-                if numeric_cols_for_desc_sas:
-                    desc_stats_sas = sample_sas[numeric_cols_for_desc_sas].describe()
+                with stage("descriptive_stats", rows=len(sample_sas)):
+                    desc_stats_sas = descriptive_stats(sample_sas)
+                if desc_stats_sas is not None:
                     st.dataframe(desc_stats_sas)
-                    st.download_button(
-                        label="Télécharger Statistiques SAS (CSV)",
-                        data=to_csv(desc_stats_sas.T.reset_index()), # Transpose and reset for better CSV
-                        file_name='statistiques_descriptives_sas.csv',
-                        mime='text/csv',
-                        key='download_stats_sas'
+                    download_csv(
+                        sas_key,
+                        "Télécharger Statistiques SAS (CSV)",
+                        'statistiques_descriptives_sas.csv',
+                        desc_stats_sas.T.reset_index()
                     )
                 else:
                     st.warning("Aucune colonne numérique appropriée trouvée pour les statistiques descriptives.")
 
 
                 st.subheader(f"3. Tableau Comparatif: {comp_var_sas}")
-                props_sample = sample_sas[comp_var_sas].value_counts(normalize=True).mul(100).round(2).rename("Proportion Échantillon (%)")
-                props_frame = df_frame[comp_var_sas].value_counts(normalize=True).mul(100).round(2).rename("Proportion Cadre (%)")
-
-                comparison_df = pd.concat([props_sample, props_frame], axis=1).fillna(0)
-                comparison_df.index.name = comp_var_sas
+                with stage("comparison", rows=len(sample_sas), variable=comp_var_sas):
+                    comparison_df = comparison_table(sample_sas, comp_var_sas, profile.proportions[comp_var_sas])
                 st.dataframe(comparison_df)
-                st.download_button(
-                    label=f"Télécharger Tableau Comparatif {comp_var_sas} (CSV)",
-                    data=to_csv(comparison_df.reset_index()),
-                    file_name=f'comparaison_{comp_var_sas}_sas.csv',
-                    mime='text/csv',
-                    key='download_comp_table_sas'
+                download_csv(
+                    sas_key,
+                    f"Télécharger Tableau Comparatif {comp_var_sas} (CSV)",
+                    f'comparaison_{comp_var_sas}_sas.csv',
+                    comparison_df.reset_index()
                 )
 
                 st.subheader(f"4. Graphique Comparatif: {comp_var_sas} ")
                 try:
+                    import matplotlib.pyplot as plt
+
                     N_TOP_CATEGORIES = 20
-                    top_categories_in_sample = props_sample.head(N_TOP_CATEGORIES).index.tolist()
+                    top_categories_in_sample = comparison_df["Proportion Échantillon (%)"].nlargest(N_TOP_CATEGORIES).index.tolist()
                     plot_df = comparison_df.loc[top_categories_in_sample]
 
                     if not plot_df.empty:
-                        fig, ax = plt.subplots(figsize=(12, 7))
-                        plot_df.plot(kind='bar', ax=ax)
-                        ax.set_ylabel("Pourcentage (%)")
-                        ax.set_title(f"Comparaison des proportions pour '{comp_var_sas}' (Top {len(plot_df)} de l'échantillon)")
-                        ax.tick_params(axis='x', rotation=70, labelsize=8)
-                        plt.tight_layout()
-                        st.pyplot(fig)
-
-                        buf = BytesIO()
-                        fig.savefig(buf, format="png", bbox_inches='tight')
-                        st.download_button(
-                            label="Télécharger le Graphique (PNG)",
-                            data=buf.getvalue(),
-                            file_name=f"graphique_comparaison_{comp_var_sas}_sas.png",
-                            mime="image/png",
-                            key='download_graph_sas_top_n'
+                        with stage("chart", rows=len(plot_df)):
+                            fig, ax = plt.subplots(figsize=(12, 7))
+                            plot_df.plot(kind='bar', ax=ax)
+                            ax.set_ylabel("Pourcentage (%)")
+                            ax.set_title(f"Comparaison des proportions pour '{comp_var_sas}' (Top {len(plot_df)} de l'échantillon)")
+                            ax.tick_params(axis='x', rotation=70, labelsize=8)
+                            plt.tight_layout()
+                            st.pyplot(fig)
+
+                        lazy_download(
+                            sas_key,
+                            "Télécharger le Graphique (PNG)",
+                            f"graphique_comparaison_{comp_var_sas}_sas.png",
+                            "image/png",
+                            lambda path: fig.savefig(path, format="png", bbox_inches='tight')
                         )
+                        plt.close(fig)
                     else:
                         st.warning(f"Aucune donnée à afficher pour le graphique de '{comp_var_sas}' (échantillon possiblement trop petit ou variable sans catégories fréquentes).")
                 except Exception as e:
                     st.error(f"Erreur lors de la génération du graphique : {e}")
 
+                st.subheader("5. Estimations Pondérées (Horvitz-Thompson)")
+                show_ht_estimates(sample_sas, None, domain_sas, sas_key, 'sas')
 
     elif sampling_method == "Stratifié (Allocation Proportionnelle)":
-        st.header("Méthode: Stratification à Allocation Proportionnelle")
-
         st.sidebar.subheader("Paramètres Stratification")
         n_strat = st.sidebar.number_input(
             "Taille totale de l'échantillon (n):",
@@ -233,131 +381,403 @@ if df_frame is not None:
             strat_var_options,
             key="strat_var_select"
         )
-
-        if st.sidebar.button("Générer l'échantillon Stratifié", key="strat_button"):
+        allocation_labels = {
+            "Proportionnelle": "proportional",
+            "Égale": "equal",
+            "Optimale (Neyman)": "neyman",
+        }
+        allocation_label = st.sidebar.selectbox(
+            "Type d'allocation:",
+            list(allocation_labels),
+            key="allocation_method_select"
+        )
+        min_strat = min_per_stratum_selectbox("min_strat_select")
+        domain_strat = domain_selectbox("domain_strat_select")
+        allocation_method = allocation_labels[allocation_label]
+        st.header(f"Méthode: Stratification à Allocation {allocation_label}")
+
+        strat_key = DrawKey(frame_key, "strat", int(n_strat), strat_var, allocation_method, 42,
+                            min_per_stratum=min_strat)
+        if show_results("active_strat", strat_key, st.sidebar.button("Générer l'échantillon Stratifié", key="strat_button")):
             if n_strat > len(df_frame):
                 st.error(f"La taille de l'échantillon ({n_strat}) ne peut pas dépasser la taille de la population ({len(df_frame)}).")
             else:
                 st.subheader("1. Tableau des Allocations (nh) par Strate")
 
-                stratum_pop_counts = df_frame.groupby(strat_var)['pop_block'].sum().rename('Population Strate (N_h)')
-                N_total = df_frame['pop_block'].sum()
-                stratum_weights = (stratum_pop_counts / N_total) # Renamed later for display with %
-                n_h_float = (stratum_weights * n_strat) # Renamed later for display
-
-                n_h_int = np.floor(n_h_float).astype(int)
-                remainder_sum_to_distribute = n_strat - n_h_int.sum()
-
-                if remainder_sum_to_distribute > 0:
-                    fractional_parts = n_h_float - n_h_int
-                    stratum_actual_sizes_for_alloc = df_frame.groupby(strat_var).size()
-                    temp_alloc_df = pd.DataFrame({
-                        'n_h_int': n_h_int,
-                        'fractional': fractional_parts,
-                        'actual_size': stratum_actual_sizes_for_alloc
-                    }).sort_values(by='fractional', ascending=False)
-
-                    for idx in temp_alloc_df.index:
-                        if remainder_sum_to_distribute == 0:
-                            break
-                        if n_h_int.loc[idx] < temp_alloc_df.loc[idx, 'actual_size']:
-                            n_h_int.loc[idx] += 1
-                            remainder_sum_to_distribute -= 1
-
-                # Final adjustment if sum still doesn't match (e.g., n_strat too small or strata too restrictive)
-                if n_h_int.sum() != n_strat:
-                    diff_to_distribute = n_strat - n_h_int.sum()
-                    if diff_to_distribute > 0 :
-                        eligible_strata_for_remainder_final = n_h_int[n_h_int < df_frame.groupby(strat_var).size()].index.tolist()
-                        for _ in range(int(diff_to_distribute)):
-                            if not eligible_strata_for_remainder_final: break
-                            # Prioritize strata that have non-zero theoretical allocation and can still be incremented
-                            potential_strata = n_h_float[eligible_strata_for_remainder_final][n_h_float[eligible_strata_for_remainder_final]>0].sort_values(ascending=False).index
-                            incremented_this_round = False
-                            for stratum_to_increment in potential_strata:
-                                if n_h_int.loc[stratum_to_increment] < df_frame.groupby(strat_var).size().loc[stratum_to_increment]:
-                                    n_h_int.loc[stratum_to_increment] += 1
-                                    incremented_this_round = True
-                                    break # Increment one stratum per pass of the remainder
-                            if not incremented_this_round and eligible_strata_for_remainder_final: # Fallback if all eligible have 0 theoretical, pick largest available
-                                stratum_to_increment = df_frame.groupby(strat_var).size().loc[eligible_strata_for_remainder_final].idxmax()
-                                if n_h_int.loc[stratum_to_increment] < df_frame.groupby(strat_var).size().loc[stratum_to_increment]:
-                                     n_h_int.loc[stratum_to_increment] += 1
-                            # Update eligibility (this part can be complex to make perfect for all edge cases)
-                            eligible_strata_for_remainder_final = n_h_int[n_h_int < df_frame.groupby(strat_var).size()].index.tolist()
-
-
-                n_h_final = n_h_int.rename('Allocation Ajustée (n_h)')
-
-                # Cap at actual stratum size (safeguard)
-                stratum_sizes_df_final_check = df_frame.groupby(strat_var).size()
-                for s_val, alloc in n_h_final.items():
-                    if alloc > stratum_sizes_df_final_check[s_val]:
-                        n_h_final[s_val] = stratum_sizes_df_final_check[s_val]
-
-                n_strat_final_adjusted = n_h_final.sum()
-                if n_strat_final_adjusted != n_strat and abs(n_strat_final_adjusted - n_strat) > 0: # Show warning only if different
-                     st.warning(f"La taille totale de l'échantillon a été ajustée à {n_strat_final_adjusted} en raison des contraintes de taille des strates et de l'arrondissement.")
-
-                allocation_df = pd.DataFrame({
-                    'Population Strate (N_h)': stratum_pop_counts,
-                    'Poids Strate (W_h %)': (stratum_weights * 100).round(2),
-                    'Allocation Théorique (n*W_h)': n_h_float.round(3),
-                    'Allocation Ajustée (n_h)': n_h_final
-                })
-                st.dataframe(allocation_df)
-                st.download_button(
-                    label="Télécharger Tableau d'Allocation (CSV)",
-                    data=to_csv(allocation_df.reset_index()),
-                    file_name='allocations_strat.csv',
-                    mime='text/csv',
-                    key='download_alloc_table_strat'
-                )
-
-                stratified_sample_list = []
-                for stratum_value, num_to_sample in n_h_final.items():
-                    if num_to_sample > 0:
-                        stratum_df = df_frame[df_frame[strat_var] == stratum_value]
-                        actual_sample_size_for_stratum = min(int(num_to_sample), len(stratum_df))
-                        if actual_sample_size_for_stratum > 0 :
-                             stratum_sample = stratum_df.sample(n=actual_sample_size_for_stratum, replace=False, random_state=42)
-                             stratified_sample_list.append(stratum_sample)
-
-                if stratified_sample_list:
-                    final_stratified_sample = pd.concat(stratified_sample_list)
-                    st.subheader("2. Échantillon Stratifié")
-                    st.dataframe(final_stratified_sample)
-                    st.download_button(
-                        label="Télécharger l'échantillon Stratifié (CSV)",
-                        data=to_csv(final_stratified_sample),
-                        file_name='echantillon_strat.csv',
-                        mime='text/csv',
-                        key='download_sample_strat'
+                try:
+                    with stage("draw", rows=n_strat, method="strat", strat_var=strat_var, allocation=allocation_method):
+                        final_stratified_sample, allocation = result_store().get_or_compute(strat_key, lambda: draw(
+                            df_frame, "strat", n_strat, strat_var=strat_var, allocation=allocation_method, seed=42,
+                            stratum_index=stratum_index(df_frame, frame_key, strat_var), min_per_stratum=min_strat
+                        ))
+                except AllocationError as e:
+                    allocation = None
+                    st.error(f"Allocation impossible : {e}")
+
+                if allocation is not None:
+                    warn_empty_strata(allocation)
+                    allocation_df = allocation_report(allocation)
+                    st.dataframe(allocation_df)
+                    download_csv(
+                        strat_key,
+                        "Télécharger Tableau d'Allocation (CSV)",
+                        'allocations_strat.csv',
+                        allocation_df.reset_index()
                     )
 
-                    st.subheader("3. Statistiques Descriptives (Échantillon Stratifié)")
-                    numeric_cols_for_strat_desc = final_stratified_sample.select_dtypes(include=np.number).columns.tolist()
-                    numeric_cols_for_strat_desc = [col for col in numeric_cols_for_strat_desc if not col.startswith('CODE')]
-                    if 'Cumulative population' in numeric_cols_for_strat_desc:
-                        numeric_cols_for_strat_desc.remove('Cumulative population')
-
-                    if numeric_cols_for_strat_desc:
-                        desc_stats_strat = final_stratified_sample[numeric_cols_for_strat_desc].describe()
-                        st.dataframe(desc_stats_strat)
-                        st.download_button(
-                            label="Télécharger Statistiques Stratifiées (CSV)",
-                            data=to_csv(desc_stats_strat.T.reset_index()),
-                            file_name='statistiques_descriptives_strat.csv',
-                            mime='text/csv',
-                            key='download_stats_strat'
-                        )
+
+                    if len(final_stratified_sample) > 0:
+                        st.subheader("2. Échantillon Stratifié")
+                        st.dataframe(final_stratified_sample)
+                        download_sample(strat_key, final_stratified_sample, 'echantillon_strat', "l'échantillon Stratifié")
+
+                        st.subheader("3. Statistiques Descriptives (Échantillon Stratifié)")
+                        with stage("descriptive_stats", rows=len(final_stratified_sample)):
+                            desc_stats_strat = descriptive_stats(final_stratified_sample)
+                        if desc_stats_strat is not None:
+                            st.dataframe(desc_stats_strat)
+                            download_csv(
+                                strat_key,
+                                "Télécharger Statistiques Stratifiées (CSV)",
+                                'statistiques_descriptives_strat.csv',
+                                desc_stats_strat.T.reset_index()
+                            )
+                        else:
+                            st.warning("Aucune colonne numérique appropriée trouvée pour les statistiques descriptives dans l'échantillon stratifié.")
+
+                        st.subheader("4. Estimations Pondérées (Horvitz-Thompson)")
+                        show_ht_estimates(final_stratified_sample, strat_var, domain_strat, strat_key, 'strat')
                     else:
-                        st.warning("Aucune colonne numérique appropriée trouvée pour les statistiques descriptives dans l'échantillon stratifié.")
+                        st.warning("Aucun échantillon n'a pu être tiré (taille d'échantillon demandée trop petite ou strates vides après allocation).")
+
+    elif sampling_method == "PPS Systématique (Taille pop_block)":
+        st.header("Méthode: Tirage Systématique à Probabilités Proportionnelles à la Taille (PPS)")
+
+        st.sidebar.subheader("Paramètres PPS")
+        n_pps = st.sidebar.number_input(
+            "Taille de l'échantillon (n):",
+            min_value=1,
+            max_value=len(df_frame),
+            value=min(100, len(df_frame)),
+            step=10,
+            key="n_pps_input"
+        )
+        pps_strat_options = ["Aucune", "Region", "GOVERNORATE", "DELEGATION"]
+        pps_strat_choice = st.sidebar.selectbox(
+            "Variable de stratification:",
+            pps_strat_options,
+            key="pps_strat_var_select"
+        )
+        pps_strat_var = None if pps_strat_choice == "Aucune" else pps_strat_choice
+        min_pps = min_per_stratum_selectbox("min_pps_select") if pps_strat_var is not None else 0
+        domain_pps = domain_selectbox("domain_pps_select")
+
+        pps_key = DrawKey(frame_key, "pps", int(n_pps), pps_strat_var, "proportional", 42, min_per_stratum=min_pps)
+        if show_results("active_pps", pps_key, st.sidebar.button("Générer l'échantillon PPS", key="pps_button")):
+            try:
+                with stage("draw", rows=n_pps, method="pps", strat_var=pps_strat_var):
+                    sample_pps, pps_allocation = result_store().get_or_compute(pps_key, lambda: draw(
+                        df_frame, "pps", n_pps, strat_var=pps_strat_var, seed=42,
+                        pps_frame=pps_frame(df_frame, frame_key, pps_strat_var), min_per_stratum=min_pps
+                    ))
+            except ValueError as e:
+                sample_pps = None
+                st.error(f"Tirage PPS impossible : {e}")
+
+            if sample_pps is not None:
+                if pps_allocation is not None:
+                    warn_empty_strata(pps_allocation)
+                st.subheader("1. Échantillon PPS")
+                st.dataframe(sample_pps)
+                download_sample(pps_key, sample_pps, 'echantillon_pps', "l'échantillon PPS")
+
+                n_certain = int((sample_pps[PI_COLUMN] >= 1).sum())
+                if n_certain:
+                    st.info(f"{n_certain} bloc(s) de grande taille sélectionné(s) avec certitude (π_i = 1).")
+
+                st.subheader("2. Statistiques Descriptives (Échantillon PPS)")
+                with stage("descriptive_stats", rows=len(sample_pps)):
+                    desc_stats_pps = descriptive_stats(sample_pps)
+                if desc_stats_pps is not None:
+                    st.dataframe(desc_stats_pps)
+                    download_csv(
+                        pps_key,
+                        "Télécharger Statistiques PPS (CSV)",
+                        'statistiques_descriptives_pps.csv',
+                        desc_stats_pps.T.reset_index()
+                    )
+                else:
+                    st.warning("Aucune colonne numérique appropriée trouvée pour les statistiques descriptives dans l'échantillon PPS.")
+
+                st.subheader("3. Estimations Pondérées (Horvitz-Thompson)")
+                show_ht_estimates(sample_pps, pps_strat_var, domain_pps, pps_key, 'pps')
+
+    elif sampling_method == "Plan à Plusieurs Degrés (Grappes)":
+        st.header("Méthode: Tirage à Plusieurs Degrés (Unités Géographiques puis Blocs)")
+
+        st.sidebar.subheader("Paramètres du Plan à Plusieurs Degrés")
+        ms_strat_choice = st.sidebar.selectbox(
+            "Stratification du premier degré:",
+            ["Aucune", "GOVERNORATE"],
+            key="ms_strat_select"
+        )
+        ms_primary = st.sidebar.selectbox(
+            "Unités primaires (UP):",
+            ["SECTOR", "DELEGATION"],
+            key="ms_primary_select"
+        )
+        primary_codes = {"DELEGATION": "CODE DELEG", "SECTOR": "CODE SECTOR"}
+        ms_primary_method = st.sidebar.selectbox(
+            "Tirage des UP:",
+            ["PPS (Taille pop_block)", "SAS"],
+            key="ms_primary_method_select"
+        )
+        n_primary = st.sidebar.number_input(
+            "Nombre d'UP" + (" par gouvernorat:" if ms_strat_choice == "GOVERNORATE" else ":"),
+            min_value=1, value=4 if ms_strat_choice == "GOVERNORATE" else 50, step=1,
+            key="n_primary_input"
+        )
+        stages = [] if ms_strat_choice == "Aucune" else [Stage("CODE GOUV", None)]
+        stages.append(Stage(primary_codes[ms_primary], int(n_primary), "pps" if ms_primary_method.startswith("PPS") else "srs"))
+        if ms_primary == "DELEGATION":
+            n_sectors = st.sidebar.number_input(
+                "Secteurs par délégation (PPS):", min_value=1, value=3, step=1, key="n_sectors_input"
+            )
+            stages.append(Stage("CODE SECTOR", int(n_sectors), "pps"))
+        n_blocks = st.sidebar.number_input(
+            "Blocs par secteur sélectionné (SAS):", min_value=1, value=5, step=1, key="n_blocks_input"
+        )
+        stages.append(Stage("CODE BLOCK", int(n_blocks), "srs"))
+        domain_ms = domain_selectbox("domain_ms_select")
+
+        ms_key = DrawKey(frame_key, "multistage", sum(stage.n or 0 for stage in stages), seed=42, stages=tuple(stages))
+        if show_results("active_ms", ms_key, st.sidebar.button("Générer l'échantillon à plusieurs degrés", key="ms_button")):
+            try:
+                with stage("draw", method="multistage"):
+                    sample_ms = result_store().get_or_compute(ms_key, lambda: draw_multistage(
+                        df_frame, stages, seed=42, hierarchy=hierarchy_index(df_frame, frame_key)
+                    ))
+            except ValueError as e:
+                sample_ms = None
+                st.error(f"Tirage à plusieurs degrés impossible : {e}")
+
+            if sample_ms is not None:
+                ms_strata, ms_clusters = variance_design(stages)
+                st.subheader("1. Unités Sélectionnées par Degré")
+                stage_summary = pd.DataFrame({
+                    'Degré': [f"{i + 1}. {LEVEL_NAMES[stage.level]}" for i, stage in enumerate(stages)],
+                    'Tirage': ["Exhaustif" if stage.n is None else {"srs": "SAS", "pps": "PPS"}[stage.method] for stage in stages],
+                    'Unités sélectionnées': [sample_ms[stage.level].nunique() for stage in stages],
+                })
+                st.dataframe(stage_summary)
+
+                st.subheader("2. Échantillon à Plusieurs Degrés")
+                st.dataframe(sample_ms)
+                download_sample(ms_key, sample_ms, 'echantillon_plusieurs_degres', "l'échantillon à plusieurs degrés")
+
+                st.subheader("3. Statistiques Descriptives (Échantillon à Plusieurs Degrés)")
+                with stage("descriptive_stats", rows=len(sample_ms)):
+                    desc_stats_ms = descriptive_stats(sample_ms)
+                if desc_stats_ms is not None:
+                    st.dataframe(desc_stats_ms)
+                    download_csv(
+                        ms_key,
+                        "Télécharger Statistiques (CSV)",
+                        'statistiques_descriptives_plusieurs_degres.csv',
+                        desc_stats_ms.T.reset_index()
+                    )
                 else:
-                    st.warning("Aucun échantillon n'a pu être tiré (taille d'échantillon demandée trop petite ou strates vides après allocation).")
+                    st.warning("Aucune colonne numérique appropriée trouvée pour les statistiques descriptives.")
+
+                st.subheader("4. Estimations Pondérées (Horvitz-Thompson)")
+                st.write("Les erreurs-types sont calculées au niveau des unités primaires (grappes).")
+                show_ht_estimates(sample_ms, ms_strata, domain_ms, ms_key, 'ms', clusters=ms_clusters)
+
+    elif sampling_method == "Comparaison de Plans (Lot)":
+        st.header("Comparaison d'un Lot de Plans (Méthode × Strate × n × Graine)")
+
+        st.sidebar.subheader("Grille de Plans")
+        batch_method_labels = {"SAS": "sas", "Stratifié": "strat", "PPS": "pps"}
+        batch_methods = st.sidebar.multiselect(
+            "Méthodes:", list(batch_method_labels), default=list(batch_method_labels), key="batch_methods_select"
+        )
+        batch_strat_choices = st.sidebar.multiselect(
+            "Variables de stratification:", ["Aucune", "Region", "GOVERNORATE", "DELEGATION"],
+            default=["Aucune", "Region"], key="batch_strat_select"
+        )
+        batch_allocation_labels = {"Proportionnelle": "proportional", "Égale": "equal", "Optimale (Neyman)": "neyman"}
+        batch_allocations = st.sidebar.multiselect(
+            "Allocations (plans stratifiés):", list(batch_allocation_labels), default=["Proportionnelle"],
+            key="batch_allocation_select"
+        )
+        min_batch = min_per_stratum_selectbox("min_batch_select")
+        batch_n_text = st.sidebar.text_input("Tailles d'échantillon (n), séparées par des virgules:", "100, 500", key="batch_n_input")
+        batch_seed_text = st.sidebar.text_input("Graines aléatoires, séparées par des virgules:", "1, 2, 3", key="batch_seed_input")
+        potential_comp_vars = profile.comparison_candidates
+        comp_var_batch = st.sidebar.selectbox(
+            "Variable comparative échantillon-cadre:",
+            potential_comp_vars,
+            index=potential_comp_vars.index('Area') if 'Area' in potential_comp_vars else 0,
+            key="comp_var_batch_select"
+        )
+        batch_executor = st.sidebar.selectbox(
+            "Exécution parallèle:", ["Threads", "Processus (cadre partagé en mémoire)"], key="batch_executor_select"
+        )
+        batch_workers = st.sidebar.number_input("Workers:", min_value=1, max_value=32, value=2, step=1, key="batch_workers_input")
+
+        try:
+            batch_ns = [int(value) for value in batch_n_text.split(",") if value.strip()]
+            batch_seeds = [int(value) for value in batch_seed_text.split(",") if value.strip()]
+        except ValueError:
+            batch_ns = batch_seeds = []
+        designs = design_grid(
+            [batch_method_labels[label] for label in batch_methods],
+            [None if choice == "Aucune" else choice for choice in batch_strat_choices],
+            batch_ns, batch_seeds,
+            [batch_allocation_labels[label] for label in batch_allocations],
+            min_per_stratum=min_batch,
+        )
+        st.sidebar.write(f"{len(designs)} plan(s) dans la grille.")
+
+        # Results do not depend on the executor or the number of workers, so they are not part of the key.
+        batch_key = DrawKey(frame_key, "batch", len(designs), designs=(comp_var_batch,) + tuple(designs))
+        clicked = st.sidebar.button("Comparer les plans", key="batch_button")
+        if not designs:
+            if clicked:
+                st.error("La grille est vide : choisissez au moins une méthode, une taille et une graine (nombres entiers séparés par des virgules).")
+        elif show_results("active_batch", batch_key, clicked):
+            try:
+                with stage("batch", rows=len(designs)):
+                    batch = result_store().get_or_compute(batch_key, lambda: run_batch(
+                        df_frame, designs, compare_var=comp_var_batch, variables=HT_VARIABLES,
+                        workers=int(batch_workers), executor="process" if batch_executor.startswith("Processus") else "thread"
+                    ))
+            except ValueError as e:
+                batch = None
+                st.error(f"Comparaison impossible : {e}")
+
+            if batch is not None:
+                st.subheader("1. Plans Comparés")
+                n_empty = int((batch.designs['empty_strata'] > 0).sum())
+                n_singleton = int((batch.designs['singleton_strata'] > 0).sum())
+                if n_empty:
+                    st.warning(
+                        f"{n_empty} plan(s) laissent des strates sans bloc tiré (colonne empty_strata) : leurs "
+                        "estimations sont biaisées et leurs CV ne sont pas comparables aux autres plans."
+                    )
+                if n_singleton:
+                    st.warning(
+                        f"{n_singleton} plan(s) ont des strates avec un seul bloc tiré (colonne singleton_strata) : "
+                        "leur variance est omise et leurs CV sont sous-estimés. Choisissez un minimum de 2 blocs par strate."
+                    )
+                st.dataframe(batch.designs)
+
+                st.subheader("2. Moyennes Estimées par Bloc (Horvitz-Thompson)")
+                means = batch.estimates[batch.estimates['parameter'] == 'mean']
+                summary = means.pivot(index='design', columns='variable', values=['estimate', 'cv'])
+                summary.columns = [f"{value} {variable}" for value, variable in summary.columns]
+                st.dataframe(batch.designs.set_index('design').join(summary))
+
+                st.subheader("3. Estimations HT de Tous les Plans")
+                st.dataframe(batch.estimates)
+
+                st.subheader("4. Allocations par Strate")
+                st.dataframe(batch.allocations)
+
+                st.subheader(f"5. Comparaison Échantillon-Cadre : {comp_var_batch}")
+                st.dataframe(batch.comparisons)
+
+                lazy_download(
+                    batch_key,
+                    "Télécharger tous les tableaux (ZIP)",
+                    'comparaison_plans.zip',
+                    'application/zip',
+                    lambda path: write_batch(batch, path)
+                )
+
+    elif sampling_method == "Évaluation Monte Carlo (Réplications)":
+        st.header("Évaluation du Plan par Réplications Monte Carlo")
+
+        st.sidebar.subheader("Paramètres des Réplications")
+        n_mc = st.sidebar.number_input(
+            "Taille de l'échantillon (n):",
+            min_value=1,
+            max_value=len(df_frame),
+            value=min(100, len(df_frame)),
+            step=10,
+            key="n_mc_input"
+        )
+        mc_design_options = ["SAS", "Region", "GOVERNORATE", "DELEGATION"]
+        mc_design = st.sidebar.selectbox(
+            "Plan (SAS ou variable de stratification):",
+            mc_design_options,
+            key="mc_design_select"
+        )
+        mc_strat_var = None if mc_design == "SAS" else mc_design
+        min_mc = min_per_stratum_selectbox("min_mc_select") if mc_strat_var is not None else 0
+        n_replicates = st.sidebar.number_input(
+            "Nombre de réplications (R):",
+            min_value=100,
+            max_value=100000,
+            value=1000,
+            step=100,
+            key="n_replicates_input"
+        )
+        mc_seed = st.sidebar.number_input("Graine aléatoire:", min_value=0, value=42, step=1, key="mc_seed_input")
+        mc_workers = st.sidebar.number_input("Processus parallèles:", min_value=1, max_value=32, value=1, step=1, key="mc_workers_input")
+
+        mc_key = DrawKey(frame_key, "mc", int(n_mc), mc_strat_var, "proportional", int(mc_seed), int(n_replicates),
+                         min_per_stratum=min_mc)
+        if show_results("active_mc", mc_key, st.sidebar.button("Lancer les réplications", key="mc_button")):
+            try:
+                if mc_strat_var is not None:
+                    warn_empty_strata(allocate_frame(df_frame, mc_strat_var, n_mc, min_per_stratum=min_mc))
+                with stage("replications", rows=int(n_replicates), method="mc", strat_var=mc_strat_var):
+                    mc_estimates = result_store().get_or_compute(mc_key, lambda: replicate_estimates(
+                        df_frame, n_mc, strat_var=mc_strat_var, R=int(n_replicates),
+                        seed=int(mc_seed), workers=int(mc_workers), min_per_stratum=min_mc
+                    ))
+            except AllocationError as e:
+                mc_estimates = None
+                st.error(f"Allocation impossible : {e}")
+
+            if mc_estimates is not None:
+                mc_summary = replication_summary(mc_estimates, df_frame, n_mc)
+                st.subheader("1. Distribution Empirique des Estimations de la Moyenne par Bloc")
+                st.write("L'effet de plan (deff) compare la variance observée à la variance exacte d'un SAS de même taille ; "
+                         "deff_mse compare l'erreur quadratique moyenne (variance + biais²), seule mesure fiable si le plan est biaisé.")
+                st.dataframe(mc_summary)
+                download_csv(
+                    mc_key,
+                    "Télécharger le Résumé des Réplications (CSV)",
+                    'resume_replications.csv',
+                    mc_summary
+                )
+                download_csv(
+                    mc_key,
+                    "Télécharger les Estimations par Réplication (CSV)",
+                    'estimations_replications.csv',
+                    mc_estimates
+                )
+
+                st.subheader("2. Histogrammes des Estimations")
+                import matplotlib.pyplot as plt
+
+                with stage("chart", rows=len(mc_estimates)):
+                    fig, axes = plt.subplots(1, len(mc_estimates.columns), figsize=(12, 4))
+                    for ax, col in zip(np.atleast_1d(axes), mc_estimates.columns):
+                        ax.hist(mc_estimates[col], bins=50)
+                        ax.axvline(mc_summary.loc[col, 'true_mean'], color='red', linestyle='--', label='Valeur du cadre')
+                        ax.set_title(f"Moyenne estimée de '{col}'")
+                        ax.legend()
+                    plt.tight_layout()
+                    st.pyplot(fig)
+                plt.close(fig)
 
     elif sampling_method == "--Select--":
         st.info("Veuillez sélectionner une méthode d'échantillonnage dans la barre latérale.")
 
 else:
     st.warning("Le cadre de sondage n'a pas pu être chargé. Veuillez vérifier le fichier et le chemin d'accès.")
+
+show_performance(perf)
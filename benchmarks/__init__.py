@@ -0,0 +1,7 @@
+"""Benchmark harness for the sampling pipeline on synthetic frames (10k to 10M blocks).
+
+Run from the repository root::
+
+    python -m benchmarks --sizes 10k 100k 1M -o benchmarks/results/latest.json
+    python -m benchmarks --sizes 10k 100k --baseline benchmarks/results/latest.json
+"""
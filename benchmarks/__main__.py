@@ -0,0 +1,56 @@
+"""Command-line entry point: `python -m benchmarks --sizes 10k 100k 1M 10M ...`."""
+import argparse
+import sys
+from datetime import datetime
+from pathlib import Path
+
+from benchmarks.harness import METHODS, STRATA, compare, run_benchmarks, write_results
+from benchmarks.synthetic import parse_size
+from sondage.allocation import ALLOCATION_METHODS
+
+DEFAULT_WORKDIR = Path(__file__).parent / "data"
+DEFAULT_RESULTS_DIR = Path(__file__).parent / "results"
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="benchmarks", description="Mesure des temps et de la mémoire de chaque étape sur des cadres synthétiques.")
+    parser.add_argument("--sizes", nargs="+", default=["10k", "100k", "1M"],
+                        help="Nombres de blocs (10k, 100k, 1M, 10M ou un entier).")
+    parser.add_argument("--methods", nargs="+", choices=METHODS, default=list(METHODS))
+    parser.add_argument("--strata", nargs="+", default=list(STRATA), help="Granularités de stratification.")
+    parser.add_argument("--allocations", nargs="+", choices=ALLOCATION_METHODS, default=list(ALLOCATION_METHODS))
+    parser.add_argument("--n-fraction", type=float, default=0.01, help="Taille d'échantillon en fraction du cadre.")
+    parser.add_argument("--repeat", type=int, default=3, help="Répétitions chronométrées par étape.")
+    parser.add_argument("--no-memory", action="store_true", help="Ne pas mesurer le pic mémoire (tracemalloc).")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workdir", default=DEFAULT_WORKDIR, help="Répertoire des cadres synthétiques générés.")
+    parser.add_argument("-o", "--output", help="Fichier JSON des résultats.")
+    parser.add_argument("--baseline", help="Résultats de référence : signaler les régressions (code de sortie 1).")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Hausse relative tolérée par rapport à la référence.")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    document = run_benchmarks(
+        [parse_size(size) for size in args.sizes], args.workdir, n_fraction=args.n_fraction,
+        repeat=args.repeat, memory=not args.no_memory, seed=args.seed,
+        methods=args.methods, strata=args.strata, allocations=args.allocations,
+    )
+    output = args.output or DEFAULT_RESULTS_DIR / f"bench-{datetime.now():%Y%m%d-%H%M%S}.json"
+    print(f"Résultats -> {write_results(document, output)}", file=sys.stderr)
+
+    if args.baseline:
+        import json
+
+        with open(args.baseline, encoding="utf-8") as fh:
+            regressions = compare(document, json.load(fh), tolerance=args.tolerance)
+        for r in regressions:
+            label = "/".join(str(r[k]) for k in ("stage", "method", "strat_var", "allocation") if r[k] is not None)
+            print(f"RÉGRESSION {r['rows']} {label} {r['metric']}: {r['baseline']:.4g} -> {r['current']:.4g} (x{r['ratio']:.2f})",
+                  file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+sys.exit(main())
@@ -0,0 +1,248 @@
+"""Times and memory-profiles every pipeline stage on synthetic frames of growing size.
+
+Stages: ingest (CSV -> typed Parquet store), load (store -> DataFrame),
+profile, index (stratum index / PPS frame), allocation, draw, statistics
+(descriptive stats, frame comparison, HT estimates) and export (CSV and
+Parquet of the sample), for every method and stratification granularity.
+Each stage is run `repeat` times for wall-clock timing, then once more under
+`tracemalloc` for its peak Python/NumPy allocation, so tracing overhead
+never leaks into the timings.
+"""
+import gc
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.synthetic import synthetic_frame_path
+from sondage.allocation import ALLOCATION_METHODS, allocate_frame
+from sondage.design import draw
+from sondage.estimation import ht_means, ht_totals
+from sondage.frame import build_store, frame_version, load_frame, store_path
+from sondage.multistage import Stage, build_hierarchy_index, draw_multistage, variance_design
+from sondage.profile import build_profile
+from sondage.results import write_csv, write_parquet
+from sondage.sampling import build_pps_frame, build_stratum_index
+from sondage.streaming import stream_sample
+from sondage.tables import comparison_table, descriptive_stats, frame_proportions
+
+METHODS = ("sas", "strat", "pps", "stream", "multistage")
+# Blocks drawn per selected sector in the multi-stage benchmark (n / 5 sectors, PPS).
+MULTISTAGE_BLOCKS = 5
+STRATA = ("Region", "GOVERNORATE", "DELEGATION", "SECTOR")
+RESULT_KEYS = ("rows", "stage", "method", "strat_var", "allocation")
+HT_VARIABLES = ["pop_block", "Lodging"]
+# Timing differences below this are treated as noise when comparing runs.
+NOISE_FLOOR_S = 0.005
+
+
+def _rss():
+    try:
+        import psutil
+    except ImportError:
+        return None
+    return psutil.Process().memory_info().rss
+
+
+def measure(func, repeat=3, memory=True):
+    """Runs `func` `repeat` times; returns (last result, wall times, tracemalloc peak or None, RSS growth or None)."""
+    times, result = [], None
+    for _ in range(repeat):
+        result = None
+        gc.collect()
+        start = time.perf_counter()
+        result = func()
+        times.append(time.perf_counter() - start)
+    peak = rss_growth = None
+    if memory:
+        del result
+        gc.collect()
+        rss_before = _rss()
+        tracemalloc.start()
+        try:
+            result = func()
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        rss_after = _rss()
+        if rss_before is not None:
+            rss_growth = rss_after - rss_before
+    return result, times, peak, rss_growth
+
+
+class Recorder:
+    """Collects one record per (frame size, stage, method, granularity, allocation)."""
+
+    def __init__(self, repeat=3, memory=True, log=sys.stderr):
+        self.repeat = repeat
+        self.memory = memory
+        self.log = log
+        self.results = []
+
+    def run(self, func, rows, stage, method=None, strat_var=None, allocation=None, **extra):
+        result, times, peak, rss_growth = measure(func, repeat=self.repeat, memory=self.memory)
+        record = {
+            "rows": rows, "stage": stage, "method": method, "strat_var": strat_var, "allocation": allocation,
+            "repeat": len(times),
+            "wall_min_s": min(times),
+            "wall_median_s": float(np.median(times)),
+            "peak_traced_mib": peak / 2**20 if peak is not None else None,
+            "rss_growth_mib": rss_growth / 2**20 if rss_growth is not None else None,
+            **extra,
+        }
+        if isinstance(result, pd.DataFrame):
+            record["out_rows"] = len(result)
+        self.results.append(record)
+        if self.log is not None:
+            label = "/".join(str(v) for v in (stage, method, strat_var, allocation) if v is not None)
+            print(f"{rows:>10} {label:<40} {record['wall_min_s'] * 1e3:10.1f} ms", file=self.log)
+        return result
+
+
+def _sample_stages(recorder, df, sample, rows, method, strat_var, allocation, export_dir, clusters=None):
+    """Statistics and export stages of one drawn sample."""
+    labels = dict(method=method, strat_var=strat_var, allocation=allocation)
+    frame_props = frame_proportions(df, "Area")
+
+    def statistics():
+        descriptive_stats(sample)
+        comparison_table(sample, "Area", frame_props)
+        ht_totals(sample, HT_VARIABLES, strata=strat_var, clusters=clusters)
+        return ht_means(sample, HT_VARIABLES, strata=strat_var, clusters=clusters)
+
+    recorder.run(statistics, rows, "statistics", **labels)
+    name = "_".join(str(v) for v in (method, strat_var, allocation) if v is not None)
+    recorder.run(lambda: write_csv(sample, export_dir / f"{name}.csv"), rows, "export_csv", **labels)
+    recorder.run(lambda: write_parquet(sample, export_dir / f"{name}.parquet"), rows, "export_parquet", **labels)
+
+
+def bench_frame(recorder, frame_path, rows, n, methods=METHODS, strata=STRATA,
+                allocations=ALLOCATION_METHODS, seed=0):
+    """Runs every stage on one synthetic frame."""
+    recorder.run(lambda: build_store(frame_path), rows, "ingest")
+    df = recorder.run(lambda: load_frame(frame_path), rows, "load")
+    recorder.run(lambda: build_profile(df, frame_version(frame_path)), rows, "profile")
+
+    with tempfile.TemporaryDirectory(prefix="sondage-bench-") as tmp:
+        export_dir = Path(tmp)
+        if "sas" in methods:
+            sample, _ = recorder.run(lambda: draw(df, "sas", n, seed=seed), rows, "draw", "sas", n=n)
+            _sample_stages(recorder, df, sample, rows, "sas", None, None, export_dir)
+        if "pps" in methods:
+            pps = recorder.run(lambda: build_pps_frame(df), rows, "index", "pps")
+            sample, _ = recorder.run(lambda: draw(df, "pps", n, seed=seed, pps_frame=pps), rows, "draw", "pps", n=n)
+            _sample_stages(recorder, df, sample, rows, "pps", None, None, export_dir)
+        if "stream" in methods:
+            recorder.run(lambda: stream_sample(store_path(frame_path), n, seed=seed), rows, "draw", "stream", n=n)
+        if "multistage" in methods:
+            hierarchy = recorder.run(lambda: build_hierarchy_index(df), rows, "index", "multistage")
+            stages = [Stage("CODE SECTOR", max(1, n // MULTISTAGE_BLOCKS), "pps"), Stage("CODE BLOCK", MULTISTAGE_BLOCKS)]
+            sample = recorder.run(lambda: draw_multistage(df, stages, seed=seed, hierarchy=hierarchy),
+                                  rows, "draw", "multistage", n=n)
+            _, clusters = variance_design(stages)
+            _sample_stages(recorder, df, sample, rows, "multistage", None, None, export_dir, clusters=clusters)
+
+        for strat_var in strata:
+            H = int(df[strat_var].nunique())
+            labels = dict(strat_var=strat_var, strata=H)
+            if "strat" in methods:
+                index = recorder.run(lambda: build_stratum_index(df, strat_var), rows, "index", "strat", **labels)
+                for allocation in allocations:
+                    recorder.run(lambda: allocate_frame(df, strat_var, n, method=allocation),
+                                 rows, "allocation", "strat", allocation=allocation, n=n, **labels)
+                    sample, _ = recorder.run(
+                        lambda: draw(df, "strat", n, strat_var=strat_var, allocation=allocation, seed=seed,
+                                     stratum_index=index),
+                        rows, "draw", "strat", allocation=allocation, n=n, **labels)
+                    _sample_stages(recorder, df, sample, rows, "strat", strat_var, allocation, export_dir)
+            if "pps" in methods:
+                pps = recorder.run(lambda: build_pps_frame(df, strat_var=strat_var), rows, "index", "pps", **labels)
+                sample, _ = recorder.run(
+                    lambda: draw(df, "pps", n, strat_var=strat_var, seed=seed, pps_frame=pps),
+                    rows, "draw", "pps", allocation="proportional", n=n, **labels)
+                _sample_stages(recorder, df, sample, rows, "pps", strat_var, "proportional", export_dir)
+            if "stream" in methods:
+                recorder.run(lambda: stream_sample(store_path(frame_path), n, strat_var=strat_var, seed=seed),
+                             rows, "draw", "stream", allocation="proportional", n=n, **labels)
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def environment():
+    """Versions and machine description stored with the results."""
+    try:
+        import pyarrow
+        pyarrow_version = pyarrow.__version__
+    except ImportError:
+        pyarrow_version = None
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "git_commit": _git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "pyarrow": pyarrow_version,
+    }
+
+
+def run_benchmarks(sizes, workdir, n_fraction=0.01, repeat=3, memory=True, seed=0,
+                   methods=METHODS, strata=STRATA, allocations=ALLOCATION_METHODS, log=sys.stderr):
+    """Benchmarks every size (number of rows) and returns the results document."""
+    recorder = Recorder(repeat=repeat, memory=memory, log=log)
+    for rows in sizes:
+        start = time.perf_counter()
+        frame_path = synthetic_frame_path(workdir, rows, seed=seed)
+        if log is not None:
+            print(f"{rows:>10} cadre synthétique prêt ({time.perf_counter() - start:.1f} s) : {frame_path}", file=log)
+        n = max(1, min(rows, round(rows * n_fraction)))
+        bench_frame(recorder, frame_path, rows, n, methods=methods, strata=strata, allocations=allocations, seed=seed)
+    return {
+        "environment": environment(),
+        "settings": {"n_fraction": n_fraction, "repeat": repeat, "memory": memory, "seed": seed},
+        "results": recorder.results,
+    }
+
+
+def write_results(document, path):
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as fh:
+        json.dump(document, fh, indent=1)
+    return path
+
+
+def compare(current, baseline, tolerance=0.25):
+    """Records whose best wall time (or traced peak) grew by more than `tolerance` relative to `baseline`."""
+    previous = {tuple(r[k] for k in RESULT_KEYS): r for r in baseline["results"]}
+    regressions = []
+    for record in current["results"]:
+        old = previous.get(tuple(record[k] for k in RESULT_KEYS))
+        if old is None:
+            continue
+        for metric, floor in (("wall_min_s", NOISE_FLOOR_S), ("peak_traced_mib", 1.0)):
+            new_value, old_value = record.get(metric), old.get(metric)
+            if new_value is None or old_value is None:
+                continue
+            if new_value > old_value * (1 + tolerance) and new_value - old_value > floor:
+                regressions.append({
+                    **{k: record[k] for k in RESULT_KEYS},
+                    "metric": metric, "baseline": old_value, "current": new_value,
+                    "ratio": new_value / old_value if old_value else float("inf"),
+                })
+    return regressions
@@ -0,0 +1,150 @@
+"""Synthetic census-block frames with the schema and hierarchy of `Cadre Tunisie.csv`.
+
+The Region -> GOVERNORATE -> DELEGATION skeleton (names and codes) is taken
+from the bundled frame; sectors are generated under each delegation so that
+the mean number of blocks per sector stays close to the real one (about 5.6)
+whatever the number of rows. Block sizes follow the real `pop_block`
+distribution with a governorate-specific spread (so Neyman allocation
+differs from proportional), `Lodging` is a noisy share of `pop_block` and
+`Cumulative population` is the running total of `pop_block` within each
+governorate. Rows are produced sector by sector in chunks, so frames far
+larger than memory can be written.
+"""
+import os
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from sondage.frame import DEFAULT_FRAME_PATH
+
+COLUMNS = [
+    "Region", "GOVERNORATE", "CODE GOUV", "DELEGATION", "CODE DELEG", "SECTOR", "CODE SECTOR",
+    "Block", "CODE BLOCK", "Area", "pop_block", "Lodging", "Cumulative population",
+]
+SIZES = {"10k": 10_000, "100k": 100_000, "1M": 1_000_000, "10M": 10_000_000}
+BLOCKS_PER_SECTOR = 5.6
+URBAN_SHARE = 0.68
+CHUNK_ROWS = 500_000
+
+# Bump whenever the generated distribution changes so cached frames are rewritten.
+_GENERATOR_VERSION = 1
+
+
+def parse_size(label):
+    """Number of rows for '10k', '1M', ... or a plain integer string."""
+    if label in SIZES:
+        return SIZES[label]
+    suffixes = {"k": 1_000, "M": 1_000_000}
+    if label[-1:] in suffixes:
+        return int(float(label[:-1]) * suffixes[label[-1]])
+    return int(label)
+
+
+def delegation_skeleton(template=DEFAULT_FRAME_PATH):
+    """Distinct (Region, GOVERNORATE, CODE GOUV, DELEGATION, CODE DELEG) rows of the template frame."""
+    columns = ["Region", "GOVERNORATE", "CODE GOUV", "DELEGATION", "CODE DELEG"]
+    skeleton = pd.read_csv(template, usecols=columns, encoding="utf-8")[columns]
+    return skeleton.drop_duplicates("CODE DELEG").sort_values("CODE DELEG").reset_index(drop=True)
+
+
+def sector_table(n_rows, skeleton, rng):
+    """One row per sector: its delegation (skeleton row), code, name, area and number of blocks."""
+    n_sectors = int(min(n_rows, max(len(skeleton), round(n_rows / BLOCKS_PER_SECTOR))))
+    # Every delegation gets at least one sector, the rest are spread uniformly.
+    delegation = np.concatenate([
+        np.arange(len(skeleton)),
+        rng.integers(0, len(skeleton), n_sectors - len(skeleton)),
+    ]) if n_sectors >= len(skeleton) else rng.choice(len(skeleton), n_sectors, replace=False)
+    delegation.sort()
+    rank = np.arange(n_sectors) - np.searchsorted(delegation, delegation)
+    width = len(str(int(rank.max()) + 1))
+    codes = skeleton["CODE DELEG"].to_numpy(dtype=np.int64)[delegation] * 10**width + rank + 1
+
+    # Blocks per sector: at least one, the rest multinomial with gamma-distributed sector weights.
+    weights = rng.gamma(1.1, size=n_sectors)
+    blocks = 1 + rng.multinomial(n_rows - n_sectors, weights / weights.sum())
+    return pd.DataFrame({
+        "delegation": delegation,
+        "CODE SECTOR": codes,
+        "SECTOR": [f"SECTEUR {code}" for code in codes],
+        "Area": np.where(rng.random(n_sectors) < URBAN_SHARE, "Urban", "Rural"),
+        "blocks": blocks,
+    })
+
+
+def _chunk_rows(sectors, skeleton, block_width, spread, rng):
+    """All blocks of `sectors` as a frame in the template schema (without Cumulative population)."""
+    counts = sectors["blocks"].to_numpy()
+    sector_pos = np.repeat(np.arange(len(sectors)), counts)
+    block_rank = np.arange(len(sector_pos)) - np.repeat(np.cumsum(counts) - counts, counts) + 1
+    delegation = sectors["delegation"].to_numpy()[sector_pos]
+    deleg = skeleton.iloc[delegation]
+    gouv_code = deleg["CODE GOUV"].to_numpy()
+    sector_code = sectors["CODE SECTOR"].to_numpy()[sector_pos]
+    sector_name = sectors["SECTOR"].to_numpy()[sector_pos]
+
+    pop = rng.normal(400.0, spread[gouv_code], len(sector_pos)).clip(118.0, 599.0)
+    share = rng.normal(0.3, 0.06, len(sector_pos)).clip(0.05, 1.4)
+    return pd.DataFrame({
+        "Region": deleg["Region"].to_numpy(),
+        "GOVERNORATE": deleg["GOVERNORATE"].to_numpy(),
+        "CODE GOUV": gouv_code,
+        "DELEGATION": deleg["DELEGATION"].to_numpy(),
+        "CODE DELEG": deleg["CODE DELEG"].to_numpy(),
+        "SECTOR": sector_name,
+        "CODE SECTOR": sector_code,
+        "Block": pd.Series(sector_name).str.title() + " " + pd.Series(block_rank).astype(str),
+        "CODE BLOCK": sector_code * 10**block_width + block_rank,
+        "Area": sectors["Area"].to_numpy()[sector_pos],
+        "pop_block": pop,
+        "Lodging": pop * share,
+    })
+
+
+def iter_synthetic_frame(n_rows, template=DEFAULT_FRAME_PATH, seed=0, chunk_rows=CHUNK_ROWS):
+    """Yields a synthetic frame of `n_rows` blocks as DataFrames of about `chunk_rows` rows."""
+    rng = np.random.default_rng(seed)
+    skeleton = delegation_skeleton(template)
+    sectors = sector_table(n_rows, skeleton, rng)
+    block_width = len(str(int(sectors["blocks"].max())))
+    spread = np.zeros(int(skeleton["CODE GOUV"].max()) + 1)
+    spread[skeleton["CODE GOUV"].unique()] = rng.uniform(5.0, 30.0, skeleton["CODE GOUV"].nunique())
+
+    cumulative = {}
+    bounds = np.searchsorted(np.cumsum(sectors["blocks"].to_numpy()), np.arange(chunk_rows, n_rows, chunk_rows))
+    for part in np.split(np.arange(len(sectors)), np.unique(bounds + 1)):
+        if len(part) == 0:
+            continue
+        chunk = _chunk_rows(sectors.iloc[part], skeleton, block_width, spread, rng)
+        running = chunk.groupby("CODE GOUV", sort=False)["pop_block"].cumsum()
+        offset = chunk["CODE GOUV"].map(cumulative).fillna(0.0)
+        chunk["Cumulative population"] = running + offset
+        cumulative.update(chunk.groupby("CODE GOUV", sort=False)["Cumulative population"].last().to_dict())
+        yield chunk[COLUMNS]
+
+
+def synthetic_frame(n_rows, template=DEFAULT_FRAME_PATH, seed=0):
+    """The whole synthetic frame in memory (small sizes only)."""
+    return pd.concat(iter_synthetic_frame(n_rows, template=template, seed=seed), ignore_index=True)
+
+
+def write_synthetic_frame(path, n_rows, template=DEFAULT_FRAME_PATH, seed=0, chunk_rows=CHUNK_ROWS):
+    """Writes a synthetic frame CSV chunk by chunk (atomically) and returns its path."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(".csv.tmp")
+    header = True
+    for chunk in iter_synthetic_frame(n_rows, template=template, seed=seed, chunk_rows=chunk_rows):
+        chunk.to_csv(tmp_path, mode="w" if header else "a", header=header, index=False, encoding="utf-8")
+        header = False
+    os.replace(tmp_path, path)
+    return path
+
+
+def synthetic_frame_path(directory, n_rows, seed=0, template=DEFAULT_FRAME_PATH):
+    """Cached synthetic frame for (`n_rows`, `seed`) in `directory`, generated on first use."""
+    path = Path(directory) / f"synthetic_{n_rows}_s{seed}_v{_GENERATOR_VERSION}.csv"
+    if not path.exists():
+        write_synthetic_frame(path, n_rows, template=template, seed=seed)
+    return path
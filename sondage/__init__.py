@@ -0,0 +1,38 @@
+"""Sampling core for the Tunisian census-block frame (no Streamlit dependency).
+
+Typical use::
+
+    from sondage import load_frame, draw, ht_totals
+    df = load_frame("Cadre Tunisie.csv")
+    sample, allocation = draw(df, "strat", 500, strat_var="GOVERNORATE", seed=7)
+    ht_totals(sample, ["pop_block"], strata="GOVERNORATE")
+"""
+from sondage.allocation import AllocationError, allocate_frame
+from sondage.batch import DesignSpec, design_grid, run_batch
+from sondage.design import draw
+from sondage.estimation import ht_means, ht_ratio, ht_totals
+from sondage.frame import load_frame
+from sondage.multistage import Stage, build_hierarchy_index, draw_multistage
+from sondage.streaming import stream_sample
+from sondage.tables import allocation_report, comparison_table, descriptive_stats, frame_proportions
+
+__all__ = [
+    "AllocationError",
+    "DesignSpec",
+    "Stage",
+    "allocate_frame",
+    "allocation_report",
+    "build_hierarchy_index",
+    "comparison_table",
+    "descriptive_stats",
+    "design_grid",
+    "draw",
+    "draw_multistage",
+    "frame_proportions",
+    "ht_means",
+    "ht_ratio",
+    "ht_totals",
+    "load_frame",
+    "run_batch",
+    "stream_sample",
+]
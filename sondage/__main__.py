@@ -0,0 +1,5 @@
+import sys
+
+from sondage.cli import main
+
+sys.exit(main())
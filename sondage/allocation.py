@@ -0,0 +1,162 @@
+"""Sample-size allocation across strata.
+
+All methods reduce to a vector of non-negative stratum weights that is turned
+into integer sizes by `allocate`: capped proportional targets (strata whose
+target exceeds their number of blocks are fixed at capacity and the rest of
+`n` is spread over the others), then largest-remainder rounding. A minimum
+number of units per stratum can be imposed: strata whose target falls below it
+are fixed at the minimum and the rest of `n` is allocated over the others.
+Strata allocated no unit at all cannot be estimated from the sample (see
+`empty_strata`). Everything is array arithmetic on the H stratum totals, so
+the cost does not depend on the number of blocks once the totals are known.
+"""
+import numpy as np
+import pandas as pd
+
+ALLOCATION_METHODS = ("proportional", "equal", "neyman")
+
+
+class AllocationError(ValueError):
+    """Raised when no allocation summing exactly to n exists."""
+
+
+def allocate(weights, n, caps):
+    """Integer allocation of `n` units proportional to `weights`, with n_h <= caps.
+
+    Returns `(n_h, target)`: the integer sizes (summing exactly to `n`) and the
+    capped real-valued targets they were rounded from.
+    """
+    weights = np.asarray(weights, dtype=np.float64)
+    caps = np.asarray(caps, dtype=np.int64)
+    if weights.shape != caps.shape or weights.ndim != 1:
+        raise AllocationError("weights and caps must be 1-D arrays of the same length.")
+    if int(n) != n or n < 0:
+        raise AllocationError(f"n must be a non-negative integer (got {n}).")
+    n = int(n)
+    if not np.all(np.isfinite(weights)) or np.any(weights < 0):
+        raise AllocationError("Stratum weights must be finite and non-negative.")
+    if np.any(caps < 0):
+        raise AllocationError("Stratum capacities must be non-negative.")
+    capacity = int(caps.sum())
+    if n > capacity:
+        raise AllocationError(
+            f"n={n} exceeds the total number of units available in the strata ({capacity})."
+        )
+
+    # Water-filling: strata saturate in increasing order of cap/weight, so the
+    # number of capped strata is the first k where the level of the remaining
+    # strata no longer pushes stratum k over its capacity.
+    H = len(weights)
+    ratio = np.full(H, np.inf)
+    positive = weights > 0
+    ratio[positive] = caps[positive] / weights[positive]
+    order = np.argsort(ratio)
+    sorted_caps = caps[order]
+    sorted_weights = weights[order]
+    capped_before = np.concatenate(([0], np.cumsum(sorted_caps)[:-1]))
+    weight_from = np.cumsum(sorted_weights[::-1])[::-1]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        level = (n - capped_before) / weight_from
+    stop = (ratio[order] >= level) | (weight_from <= 0)
+    k = int(np.argmax(stop)) if stop.any() else H
+
+    sorted_target = sorted_caps.astype(np.float64)
+    if k < H:
+        remaining = n - capped_before[k]
+        rest_weights = sorted_weights[k:]
+        if rest_weights.sum() <= 0:
+            # Only zero-weight strata left: spread what remains by capacity.
+            rest_weights = sorted_caps[k:].astype(np.float64)
+        total = rest_weights.sum()
+        sorted_target[k:] = remaining * rest_weights / total if total > 0 else 0.0
+    target = np.empty(H, dtype=np.float64)
+    target[order] = sorted_target
+
+    # Largest-remainder rounding among strata that can still take a unit.
+    n_h = np.minimum(np.floor(target).astype(np.int64), caps)
+    shortfall = n - int(n_h.sum())
+    if shortfall > 0:
+        fractional = np.where(n_h < caps, target - n_h, -1.0)
+        n_h[np.argpartition(-fractional, shortfall - 1)[:shortfall]] += 1
+    if int(n_h.sum()) != n or np.any(n_h > caps):
+        raise AllocationError(f"Could not allocate n={n} within stratum capacities.")
+    return n_h, target
+
+
+def stratum_totals(df, strat_var, size_col="pop_block", variability_col="pop_block"):
+    """Per-stratum block count, size total and standard deviation in one groupby pass."""
+    totals = df.groupby(strat_var, observed=True).agg(
+        blocks=(size_col, "size"),
+        size=(size_col, "sum"),
+        sd=(variability_col, "std"),
+    )
+    totals["size"] = totals["size"].astype(np.float64)
+    totals["sd"] = totals["sd"].astype(np.float64).fillna(0.0)
+    return totals
+
+
+def allocate_with_minimum(weights, n, caps, minimum=0):
+    """`allocate` with n_h >= min(minimum, cap) in every stratum; returns `(n_h, target)` like `allocate`."""
+    weights = np.asarray(weights, dtype=np.float64)
+    caps = np.asarray(caps, dtype=np.int64)
+    if minimum <= 0:
+        return allocate(weights, n, caps)
+    lower = np.minimum(int(minimum), caps)
+    if int(lower.sum()) > n:
+        raise AllocationError(
+            f"n={n} is too small to take {minimum} unit(s) in each of the {len(caps)} strata "
+            f"({int(lower.sum())} needed)."
+        )
+    # Strata whose target falls below the minimum are fixed at it; the others share the rest of n.
+    fixed = np.zeros(len(caps), dtype=bool)
+    while True:
+        free = np.flatnonzero(~fixed)
+        n_free, target_free = allocate(weights[free], n - int(lower[fixed].sum()), caps[free])
+        below = target_free < lower[free]
+        if not below.any():
+            break
+        fixed[free[below]] = True
+    n_h = lower.copy()
+    target = lower.astype(np.float64)
+    n_h[free] = n_free
+    target[free] = target_free
+    return n_h, target
+
+
+def empty_strata(table):
+    """Strata of an allocation table that have blocks but were allocated no unit (their total is not estimated)."""
+    return table.index[(table["n_h"] == 0) & (table["blocks"] > 0)]
+
+
+def allocation_weights(totals, method="proportional"):
+    """Stratum weights W_h (summing to 1) for the given allocation method."""
+    if method == "proportional":
+        raw = totals["size"].to_numpy()
+    elif method == "equal":
+        raw = np.ones(len(totals))
+    elif method == "neyman":
+        raw = totals["blocks"].to_numpy() * totals["sd"].to_numpy()
+    else:
+        raise AllocationError(f"Unknown allocation method '{method}'. Expected one of {ALLOCATION_METHODS}.")
+    total = raw.sum()
+    return raw / total if total > 0 else np.zeros(len(raw))
+
+
+def allocation_table(totals, n, method="proportional", min_per_stratum=0):
+    """Allocation table indexed by stratum: size, blocks, weight, theoretical and final n_h."""
+    weights = allocation_weights(totals, method)
+    n_h, _ = allocate_with_minimum(weights, n, totals["blocks"].to_numpy(), min_per_stratum)
+    return pd.DataFrame({
+        "size": totals["size"],
+        "blocks": totals["blocks"],
+        "weight": weights,
+        "n_theoretical": weights * n,
+        "n_h": n_h,
+    }, index=totals.index)
+
+
+def allocate_frame(df, strat_var, n, method="proportional", size_col="pop_block", variability_col="pop_block",
+                   min_per_stratum=0):
+    """Convenience wrapper: stratum totals of `df` followed by `allocation_table`."""
+    totals = stratum_totals(df, strat_var, size_col=size_col, variability_col=variability_col)
+    return allocation_table(totals, n, method, min_per_stratum=min_per_stratum)
@@ -0,0 +1,247 @@
+"""Batch comparison of many designs (method x stratification variable x n x seed) on a worker pool.
+
+Every design of the grid is drawn and summarized independently: allocation
+table, HT estimates of the study variables and sample-vs-frame proportions
+of a comparison variable. Results are concatenated into long tables keyed by
+a design id, so designs can be compared side by side and exported together.
+The designs table also counts, per design, the strata left without any
+unit (biased estimates) or with a single one (variance left out), so such
+designs are not mistaken for the most precise ones.
+
+Workers share one read-only copy of the frame. Threads use the caller's
+DataFrame directly. Processes open the columns the designs need from .npy
+files memory-mapped read-only (categoricals as their integer codes), so the
+pages come from the OS page cache and no worker holds a private copy.
+Each design draws with its own seed, so results do not depend on the number
+or kind of workers.
+"""
+import multiprocessing
+import os
+import tempfile
+import warnings
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+
+from sondage.allocation import empty_strata
+from sondage.design import METHODS, draw
+from sondage.estimation import DEFAULT_VARIABLES, EmptyStrataWarning, ht_means, ht_totals, singleton_strata
+from sondage.instrument import add_worker_cpu, cpu_timed
+from sondage.sampling import PI_COLUMN, build_pps_frame, build_stratum_index
+from sondage.tables import allocation_report, comparison_table, frame_proportions
+
+EXECUTORS = ("thread", "process")
+GRID_COLUMNS = ["design", "method", "strat_var", "allocation", "min_per_stratum", "n", "seed"]
+# Per-design counts of strata left out of the estimates (empty) or of their variance (a single unit).
+STRATA_CHECK_COLUMNS = ["empty_strata", "singleton_strata"]
+
+# Frame, frame proportions and index cache installed once per worker process by `_init_worker`.
+_WORKER_STATE = None
+
+
+class DesignSpec(NamedTuple):
+    method: str
+    strat_var: str = None
+    n: int = 100
+    seed: int = None
+    allocation: str = "proportional"
+    min_per_stratum: int = 0
+
+
+class BatchResult(NamedTuple):
+    designs: pd.DataFrame
+    allocations: pd.DataFrame
+    estimates: pd.DataFrame
+    comparisons: pd.DataFrame
+    samples: pd.DataFrame
+
+
+class SharedFrame(NamedTuple):
+    """Columns of a frame saved as .npy files; `categories` holds the labels of categorical columns."""
+
+    directory: str
+    n_rows: int
+    columns: tuple
+    categories: dict
+
+
+def design_grid(methods, strat_vars, ns, seeds, allocations=("proportional",), min_per_stratum=0):
+    """Every combination as a list of DesignSpec; SAS ignores strat_var and allocation, PPS the allocation.
+
+    `min_per_stratum` applies to every stratified design (see `allocate_with_minimum`).
+    """
+    designs = []
+    for method in methods:
+        if method not in METHODS:
+            raise ValueError(f"Unknown method '{method}'. Expected one of {METHODS}.")
+        if method == "sas":
+            variables, method_allocations = [None], [None]
+        elif method == "strat":
+            variables, method_allocations = [v for v in strat_vars if v is not None], allocations
+        else:
+            variables, method_allocations = strat_vars, ["proportional"]
+        for strat_var in variables:
+            for allocation in method_allocations if strat_var is not None else [None]:
+                for n in ns:
+                    for seed in seeds:
+                        designs.append(DesignSpec(method, strat_var, int(n), seed, allocation,
+                                                  min_per_stratum if strat_var is not None else 0))
+    return designs
+
+
+def share_frame(df, columns, directory):
+    """Writes `columns` of `df` to `directory` for `open_shared_frame` (categoricals as codes)."""
+    categories = {}
+    for col in columns:
+        values = df[col]
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            categories[col] = list(values.cat.categories)
+            values = values.cat.codes
+        np.save(_column_file(directory, col), np.ascontiguousarray(values.to_numpy()))
+    return SharedFrame(directory=directory, n_rows=len(df), columns=tuple(columns), categories=categories)
+
+
+def _column_file(directory, col):
+    return os.path.join(directory, f"{col.replace(os.sep, '_')}.npy")
+
+
+def open_shared_frame(shared):
+    """Read-only DataFrame over the memory-mapped columns of `shared` (no copy of the data)."""
+    data = {}
+    for col in shared.columns:
+        values = np.load(_column_file(shared.directory, col), mmap_mode="r")
+        if col in shared.categories:
+            values = pd.Categorical.from_codes(values, categories=shared.categories[col])
+        data[col] = values
+    return pd.DataFrame(data, copy=False)
+
+
+def _init_worker(shared, compare_var):
+    global _WORKER_STATE
+    df = open_shared_frame(shared)
+    _WORKER_STATE = (df, frame_proportions(df, compare_var), {})
+
+
+def _cached(cache, key, build):
+    if key not in cache:
+        cache[key] = build()
+    return cache[key]
+
+
+def _evaluate(df, frame_props, cache, spec, compare_var, variables):
+    """Draws one design and returns its allocation, estimate, comparison and sample tables."""
+    kwargs = {}
+    if spec.method == "strat":
+        kwargs["stratum_index"] = _cached(cache, ("strat", spec.strat_var), lambda: build_stratum_index(df, spec.strat_var))
+    elif spec.method == "pps":
+        kwargs["pps_frame"] = _cached(cache, ("pps", spec.strat_var), lambda: build_pps_frame(df, strat_var=spec.strat_var))
+    sample, table = draw(df, spec.method, spec.n, strat_var=spec.strat_var,
+                         allocation=spec.allocation or "proportional", seed=spec.seed,
+                         min_per_stratum=spec.min_per_stratum, **kwargs)
+
+    strata = spec.strat_var if spec.method != "sas" else None
+    checks = {
+        "empty_strata": len(empty_strata(table)) if table is not None else 0,
+        "singleton_strata": len(singleton_strata(sample, strata)),
+    }
+    estimates = pd.concat({
+        "total": ht_totals(sample, variables, strata=strata),
+        "mean": ht_means(sample, variables, strata=strata),
+    }, names=["parameter"]).rename(columns={"n": "n_sample"}).reset_index()
+    comparison = comparison_table(sample, compare_var, frame_props)
+    comparison.index.name = "category"
+    allocation = None
+    if table is not None:
+        allocation = allocation_report(table)
+        allocation.index.name = "stratum"
+        allocation = allocation.reset_index()
+    return {
+        "checks": checks,
+        "allocations": allocation,
+        "estimates": estimates,
+        "comparisons": comparison.reset_index(),
+        "samples": pd.DataFrame({"row": sample.index.to_numpy(), PI_COLUMN: sample[PI_COLUMN].to_numpy()}),
+    }
+
+
+def _evaluate_in_worker(spec, compare_var, variables):
+    df, frame_props, cache = _WORKER_STATE
+    return _evaluate(df, frame_props, cache, spec, compare_var, variables)
+
+
+def _stack(parts, designs, key):
+    frames = [
+        part[key].assign(design=design_id)
+        for design_id, part in enumerate(parts) if part[key] is not None
+    ]
+    if not frames:
+        return pd.DataFrame(columns=GRID_COLUMNS)
+    stacked = pd.concat(frames, ignore_index=True).merge(designs, on="design", how="left")
+    return stacked[GRID_COLUMNS + [c for c in stacked.columns if c not in GRID_COLUMNS]]
+
+
+def run_batch(df, designs, compare_var="Area", variables=DEFAULT_VARIABLES, workers=1, executor="thread"):
+    """Runs every design of `designs` (DesignSpec list, e.g. from `design_grid`) and consolidates the results.
+
+    `executor` is 'thread' or 'process'; with workers=1 the designs run in
+    the calling thread. Tables are in design order whatever the scheduling.
+    """
+    if executor not in EXECUTORS:
+        raise ValueError(f"Unknown executor '{executor}'. Expected one of {EXECUTORS}.")
+    designs = [DesignSpec(*spec) for spec in designs]
+    variables = list(variables)
+    if workers <= 1 or len(designs) <= 1 or executor == "thread":
+        # Threads share `df` and the index cache as they are (dict updates are atomic).
+        run = partial(_evaluate, df, frame_proportions(df, compare_var), {},
+                      compare_var=compare_var, variables=variables)
+        if workers <= 1 or len(designs) <= 1:
+            timed = [(run(spec), 0.0) for spec in designs]
+        else:
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                timed = list(pool.map(cpu_timed(run), designs))
+    else:
+        columns = list(dict.fromkeys(
+            [compare_var, "pop_block", *variables, *(spec.strat_var for spec in designs if spec.strat_var)]
+        ))
+        with tempfile.TemporaryDirectory(prefix="sondage-batch-") as directory:
+            shared = share_frame(df, columns, directory)
+            # Spawned, not forked: forking a multithreaded process (e.g. the Streamlit server) can deadlock.
+            with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+                                     initializer=_init_worker, initargs=(shared, compare_var)) as pool:
+                timed = list(pool.map(cpu_timed(partial(_evaluate_in_worker, compare_var=compare_var,
+                                                        variables=variables)), designs))
+    # Serial runs are already counted by the caller's stage; pool workers report their own CPU time.
+    parts = [part for part, _ in timed]
+    add_worker_cpu(sum(cpu for _, cpu in timed))
+
+    table = pd.DataFrame(designs, columns=list(DesignSpec._fields))
+    table.insert(0, "design", np.arange(len(designs)))
+    table = table[GRID_COLUMNS]
+    checks = pd.DataFrame([part["checks"] for part in parts], columns=STRATA_CHECK_COLUMNS)
+    biased = int((checks["empty_strata"] > 0).sum())
+    if biased:
+        warnings.warn(
+            f"{biased} of {len(designs)} designs leave strata without any sampled unit; their HT estimates "
+            "are biased and their SE understated (see the 'empty_strata' column of the designs table).",
+            EmptyStrataWarning, stacklevel=2,
+        )
+    return BatchResult(
+        designs=pd.concat([table, checks], axis=1),
+        allocations=_stack(parts, table, "allocations"),
+        estimates=_stack(parts, table, "estimates"),
+        comparisons=_stack(parts, table, "comparisons"),
+        samples=_stack(parts, table, "samples"),
+    )
+
+
+def write_batch(result, path):
+    """Combined export: one ZIP with a CSV per consolidated table (designs, allocations, estimates, comparisons, samples)."""
+    with zipfile.ZipFile(path, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        for name, table in result._asdict().items():
+            with archive.open(f"{name}.csv", "w") as fh:
+                table.to_csv(fh, index=False, encoding="utf-8")
+    return path
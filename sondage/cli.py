@@ -0,0 +1,184 @@
+"""Command-line entry point: `python -m sondage draw ...`, `... batch ...` and `... ingest ...`.
+
+Only pandas/numpy are imported; no Streamlit or plotting library is loaded.
+"""
+import argparse
+import os
+import sys
+from pathlib import Path
+
+from sondage.allocation import ALLOCATION_METHODS
+from sondage.batch import EXECUTORS
+from sondage.design import METHODS
+from sondage.frame import DEFAULT_FRAME_PATH
+from sondage.streaming import DEFAULT_CHUNKSIZE
+
+
+def write_table(df, path, index=False):
+    """Writes `df` as Parquet or CSV depending on the file extension."""
+    path = Path(path)
+    if path.suffix == ".parquet":
+        df.to_parquet(path, index=index)
+    else:
+        df.to_csv(path, index=index)
+
+
+def _check_columns(columns, frame, **options):
+    """Rejects an option value (e.g. var="DELEGATION") that is not a column of the frame."""
+    for option, names in options.items():
+        for name in names if isinstance(names, list) else [names]:
+            if name is not None and name not in columns:
+                raise SystemExit(f"error: --{option} '{name}' is not a column of {frame}.")
+
+
+def _draw(args):
+    from sondage import tables
+
+    if args.stream:
+        from sondage.streaming import frame_columns, stream_sample
+
+        if args.method == "strat":
+            _check_columns(frame_columns(args.frame), args.frame, var=args.var)
+        sample = stream_sample(
+            args.frame, args.n, strat_var=args.var if args.method == "strat" else None,
+            allocation=args.allocation, chunksize=args.chunksize, seed=args.seed,
+            min_per_stratum=args.min_per_stratum,
+        )
+        allocation = None
+    elif args.method == "multistage":
+        from sondage.frame import load_frame
+        from sondage.multistage import draw_multistage, parse_stages
+
+        sample = draw_multistage(load_frame(args.frame), parse_stages(args.stages), seed=args.seed)
+        allocation = None
+    else:
+        from sondage.design import draw
+        from sondage.frame import load_frame
+
+        df = load_frame(args.frame)
+        _check_columns(df.columns, args.frame, var=args.var if args.method != "sas" else None, compare=args.compare)
+        sample, allocation = draw(df, args.method, args.n, strat_var=args.var, allocation=args.allocation, seed=args.seed,
+                                  min_per_stratum=args.min_per_stratum)
+        if args.compare:
+            print(tables.comparison_table(sample, args.compare, tables.frame_proportions(df, args.compare)).to_string())
+
+    if allocation is not None:
+        from sondage.allocation import empty_strata
+
+        empty = empty_strata(allocation)
+        if len(empty):
+            print(f"attention : {len(empty)} strate(s) sans bloc tiré (n_h = 0), les estimations les omettent ; "
+                  f"voir --min-per-stratum.", file=sys.stderr)
+    write_table(sample, args.output)
+    if args.allocation_output and allocation is not None:
+        write_table(tables.allocation_report(allocation), args.allocation_output, index=True)
+    print(f"{len(sample)} blocs tirés ({args.method}) -> {args.output}", file=sys.stderr)
+
+
+def _batch(args):
+    from sondage.batch import design_grid, run_batch, write_batch
+    from sondage.frame import load_frame
+
+    strat_vars = [None if var == "none" else var for var in args.vars]
+    designs = design_grid(args.methods, strat_vars, args.n, args.seeds, args.allocations,
+                          min_per_stratum=args.min_per_stratum)
+    if not designs:
+        raise SystemExit("error: the grid is empty (stratified designs need at least one variable in --vars).")
+    df = load_frame(args.frame)
+    _check_columns(df.columns, args.frame, vars=strat_vars, compare=args.compare)
+    result = run_batch(df, designs, compare_var=args.compare, workers=args.workers, executor=args.executor)
+    write_batch(result, args.output)
+    print(f"{len(designs)} plans comparés ({args.executor}, {args.workers} workers) -> {args.output}", file=sys.stderr)
+
+
+def _ingest(args):
+    from sondage.frame import read_frame_csv, store_path, write_store
+
+    if Path(args.frame).suffix == ".parquet":
+        raise SystemExit("error: ingest builds the Parquet store from a CSV frame; a Parquet frame is used as is.")
+    df = read_frame_csv(args.frame)
+    try:
+        write_store(args.frame, df)
+    except (OSError, ImportError) as exc:
+        raise SystemExit(f"error: could not write {store_path(args.frame)}: {exc}") from exc
+    print(f"{len(df)} lignes -> {store_path(args.frame)}", file=sys.stderr)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="sondage", description="Tirage d'échantillons sur le cadre des blocs du recensement.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    draw_parser = sub.add_parser("draw", help="Tirer un échantillon et l'écrire en CSV ou Parquet.")
+    draw_parser.add_argument("--frame", default=DEFAULT_FRAME_PATH, help="Cadre de sondage (CSV ou Parquet).")
+    draw_parser.add_argument("--method", choices=METHODS + ("multistage",), default="sas")
+    draw_parser.add_argument("--var", help="Variable de stratification (Region, GOVERNORATE, DELEGATION...).")
+    draw_parser.add_argument("--allocation", choices=ALLOCATION_METHODS, default="proportional")
+    draw_parser.add_argument("--n", type=int, help="Taille de l'échantillon.")
+    draw_parser.add_argument("--min-per-stratum", type=int, default=0,
+                             help="Nombre minimal de blocs tirés dans chaque strate (0 : aucun minimum).")
+    draw_parser.add_argument("--stages", help="Degrés du plan multistage, ex. 'SECTOR:pps:100,Block:srs:5' (N ou 'all').")
+    draw_parser.add_argument("--seed", type=int, default=None)
+    draw_parser.add_argument("-o", "--output", required=True, help="Fichier de sortie (.csv ou .parquet).")
+    draw_parser.add_argument("--allocation-output", help="Fichier pour le tableau d'allocation (plans stratifiés).")
+    draw_parser.add_argument("--compare", help="Afficher la comparaison échantillon-cadre pour cette variable.")
+    draw_parser.add_argument("--stream", action="store_true", help="Lire le cadre par blocs (cadres hors mémoire).")
+    draw_parser.add_argument("--chunksize", type=int, default=DEFAULT_CHUNKSIZE)
+    draw_parser.add_argument("--profile", action="store_true",
+                             help="Mesurer chaque étape (journal JSON sur stderr, fichier Prometheus si $SONDAGE_PROMETHEUS_FILE).")
+    draw_parser.set_defaults(func=_draw)
+
+    batch_parser = sub.add_parser("batch", help="Comparer une grille de plans (méthode x strate x n x graine) en parallèle.")
+    batch_parser.add_argument("--frame", default=DEFAULT_FRAME_PATH, help="Cadre de sondage (CSV ou Parquet).")
+    batch_parser.add_argument("--methods", nargs="+", choices=METHODS, default=list(METHODS))
+    batch_parser.add_argument("--vars", nargs="+", default=["none"],
+                              help="Variables de stratification ('none' : plans non stratifiés).")
+    batch_parser.add_argument("--allocations", nargs="+", choices=ALLOCATION_METHODS, default=["proportional"])
+    batch_parser.add_argument("--n", nargs="+", type=int, required=True, help="Tailles d'échantillon.")
+    batch_parser.add_argument("--seeds", nargs="+", type=int, default=[0])
+    batch_parser.add_argument("--min-per-stratum", type=int, default=0,
+                              help="Nombre minimal de blocs tirés dans chaque strate des plans stratifiés.")
+    batch_parser.add_argument("--compare", default="Area", help="Variable de comparaison échantillon-cadre.")
+    batch_parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    batch_parser.add_argument("--executor", choices=EXECUTORS, default="thread",
+                              help="'process' : le cadre est partagé en lecture seule par fichiers mappés en mémoire.")
+    batch_parser.add_argument("-o", "--output", required=True, help="Archive ZIP des tableaux consolidés.")
+    batch_parser.add_argument("--profile", action="store_true", help="Mesurer chaque étape (voir draw --profile).")
+    batch_parser.set_defaults(func=_batch)
+
+    ingest_parser = sub.add_parser("ingest", help="Construire le stockage Parquet typé du cadre.")
+    ingest_parser.add_argument("--frame", default=DEFAULT_FRAME_PATH, help="Cadre de sondage CSV.")
+    ingest_parser.set_defaults(func=_ingest)
+    return parser
+
+
+def _profiled(func, args):
+    from sondage.instrument import Profiler, configure_logging, profiling, stage, write_prometheus
+
+    configure_logging()
+    with profiling(Profiler()):
+        with stage(args.command):
+            func(args)
+    write_prometheus()
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.command == "draw" and args.method == "strat" and not args.var:
+        parser.error("--method strat requires --var")
+    if args.command == "draw" and args.stream and args.method not in ("sas", "strat"):
+        parser.error("--stream supports the 'sas' and 'strat' methods only")
+    if args.command == "draw" and args.method == "multistage" and not args.stages:
+        parser.error("--method multistage requires --stages")
+    if args.command == "draw" and args.method != "multistage" and args.n is None:
+        parser.error("--n is required")
+    try:
+        if getattr(args, "profile", False):
+            _profiled(args.func, args)
+        else:
+            args.func(args)
+    except FileNotFoundError as exc:
+        raise SystemExit(f"error: frame not found: {exc.filename or exc}") from exc
+    except ValueError as exc:  # AllocationError included: the design cannot be drawn as specified.
+        raise SystemExit(f"error: {exc}") from exc
+    return 0
@@ -0,0 +1,43 @@
+"""One entry point for the in-memory designs: SAS, stratified SRSWOR and PPS systematic."""
+from sondage.allocation import allocate_frame
+from sondage.instrument import stage
+from sondage.sampling import build_pps_frame, build_stratum_index, draw_pps, draw_sas, draw_stratified
+
+METHODS = ("sas", "strat", "pps")
+
+
+def draw(df, method, n, strat_var=None, allocation="proportional", seed=None, stratum_index=None, pps_frame=None,
+         min_per_stratum=0):
+    """Draws a sample of `n` blocks and returns `(sample, allocation table or None)`.
+
+    `method` is 'sas', 'strat' (requires `strat_var`) or 'pps' (stratified if
+    `strat_var` is given). Prebuilt `stratum_index`/`pps_frame` can be passed
+    in to reuse them across draws. `min_per_stratum` sets a minimum n_h in
+    every stratum (see `allocate_with_minimum`); strata left with n_h = 0 are
+    absent from the sample. The sample carries `pi` and `weight`.
+    """
+    if method not in METHODS:
+        raise ValueError(f"Unknown method '{method}'. Expected one of {METHODS}.")
+    if not 0 < n <= len(df):
+        raise ValueError(f"La taille de l'échantillon ({n}) doit être comprise entre 1 et la taille de la population ({len(df)}).")
+    if method == "sas":
+        with stage("selection", rows=n):
+            return draw_sas(df, n, seed=seed), None
+    if method == "strat" and strat_var is None:
+        raise ValueError("Stratified sampling requires a stratification variable.")
+
+    table = None
+    if strat_var is not None:
+        with stage("allocation", rows=len(df)):
+            table = allocate_frame(df, strat_var, n, method=allocation, min_per_stratum=min_per_stratum)
+    if method == "strat":
+        if stratum_index is None:
+            with stage("index", rows=len(df)):
+                stratum_index = build_stratum_index(df, strat_var)
+        with stage("selection", rows=n):
+            return draw_stratified(df, stratum_index, table["n_h"], seed=seed), table
+    if pps_frame is None:
+        with stage("index", rows=len(df)):
+            pps_frame = build_pps_frame(df, strat_var=strat_var)
+    with stage("selection", rows=n):
+        return draw_pps(df, pps_frame, table["n_h"] if table is not None else n, seed=seed), table
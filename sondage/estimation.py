@@ -0,0 +1,205 @@
+"""Horvitz-Thompson estimation from weighted samples.
+
+Samples carry `pi` and `weight` columns (see `sondage.sampling`). Totals are
+HT estimates sum(w_i y_i); means and ratios are ratios of HT totals with a
+linearized variance. Variances use the stratified form
+
+    v = sum_h (1 - f_h) n_h / (n_h - 1) sum_{i in h} (z_i - zbar_h)^2,   z_i = w_i y_i,
+
+which is exact for stratified SRSWOR (f_h = n_h / N_h) and the usual
+with-replacement approximation, with f_h = mean pi_i, for unequal
+probabilities. Units with pi_i = 1 are a take-all stratum without variance.
+Strata with a single sampled unit cannot contribute a variance term and are
+left out, so the SE is understated: `SingletonStrataWarning` is issued
+(collapse such strata, or draw at least 2 units per stratum). Strata without
+any sampled unit contribute nothing at all, so the estimates miss their part
+of the population: pass the frame's strata as `frame_strata` to be warned
+(`EmptyStrataWarning`) when that happens.
+
+For multi-stage samples, pass the primary-unit column as `clusters`: rows
+are first summed per primary unit and the same formula is applied to these
+totals with f_h = 0 (ultimate-cluster, with-replacement approximation).
+
+All quantities come from sums over (stratum, domain) groups computed in one
+groupby, so domain estimates cost no more than the overall ones.
+"""
+import warnings
+from statistics import NormalDist
+
+import numpy as np
+import pandas as pd
+
+from sondage.sampling import PI_COLUMN, WEIGHT_COLUMN
+
+RESULT_COLUMNS = ["estimate", "se", "cv", "ci_low", "ci_high", "n"]
+# Study variables estimated by the batch and replication runs unless others are given.
+DEFAULT_VARIABLES = ("pop_block", "Lodging")
+
+
+class EmptyStrataWarning(UserWarning):
+    """Some strata of the frame have no sampled unit: HT estimates leave them out and are biased."""
+
+
+class SingletonStrataWarning(UserWarning):
+    """Some strata have a single sampled unit: their variance is left out and the SE is understated."""
+
+
+def check_strata(sample, strata, frame_strata):
+    """Warns (EmptyStrataWarning) about `frame_strata` labels absent from `sample[strata]`; returns them."""
+    if strata is None or frame_strata is None:
+        return pd.Index([])
+    missing = pd.Index(frame_strata).difference(pd.Index(sample[strata].unique()))
+    if len(missing):
+        warnings.warn(
+            f"{len(missing)} of {len(pd.Index(frame_strata))} strata of '{strata}' have no sampled unit "
+            f"(e.g. {', '.join(map(str, missing[:3]))}); HT estimates leave them out and are biased.",
+            EmptyStrataWarning, stacklevel=3,
+        )
+    return missing
+
+
+def singleton_strata(sample, strata=None, clusters=None):
+    """Strata with a single variance unit: one unit drawn with pi < 1, or one primary unit if `clusters` is given."""
+    stratum = sample[strata] if strata is not None else pd.Series(0, index=sample.index)
+    if clusters is not None:
+        counts = pd.DataFrame({"stratum": stratum, "cluster": sample[clusters]}).drop_duplicates()["stratum"]
+    else:
+        counts = stratum[sample[PI_COLUMN].to_numpy() < 1]
+    counts = counts.value_counts(sort=False)
+    return pd.Index(counts.index[counts == 1])
+
+
+def check_singletons(sample, strata=None, clusters=None):
+    """Warns (SingletonStrataWarning) about strata whose variance term cannot be estimated; returns them."""
+    singletons = singleton_strata(sample, strata, clusters)
+    if len(singletons):
+        where = f" of '{strata}'" if strata is not None else ""
+        warnings.warn(
+            f"{len(singletons)} strata{where} have a single sampled unit; their variance is left out and "
+            "the SE is understated (draw at least 2 units per stratum).",
+            SingletonStrataWarning, stacklevel=3,
+        )
+    return singletons
+
+
+def _grouped_moments(sample, y, x, strata, domain, clusters=None):
+    """Per (stratum, domain) sums of wy, wx, (wy)^2, wy*wx, (wx)^2 and counts, plus per-stratum variance factors."""
+    w = sample[WEIGHT_COLUMN].to_numpy(dtype=np.float64)
+    pi = sample[PI_COLUMN].to_numpy(dtype=np.float64)
+    certain = pi >= 1
+    wy = w * y
+    wx = w * x
+    count = np.ones(len(sample), dtype=np.int64)
+    stratum = sample[strata].to_numpy() if strata is not None else np.zeros(len(sample), dtype=np.int8)
+    dom = sample[domain].to_numpy() if domain is not None else np.zeros(len(sample), dtype=np.int8)
+
+    if clusters is not None:
+        # Variance units are the primary units (their domain parts): sum the rows of each first.
+        units = pd.DataFrame({
+            "stratum": stratum, "cluster": sample[clusters].to_numpy(), "domain": dom, "wy": wy, "wx": wx, "n": count,
+        }).groupby(["stratum", "cluster", "domain"], observed=True, sort=False).sum()
+        stratum = units.index.get_level_values("stratum").to_numpy()
+        dom = units.index.get_level_values("domain").to_numpy()
+        wy, wx, count = units["wy"].to_numpy(), units["wx"].to_numpy(), units["n"].to_numpy()
+        certain = np.zeros(len(units), dtype=bool)
+        psu = units.index.droplevel("domain").unique()
+        per_stratum = pd.Series(psu.get_level_values("stratum")).value_counts(sort=False).to_frame("size")
+        per_stratum["mean"] = 0.0
+    else:
+        # Per-stratum sample size and sampling fraction over units drawn with pi < 1.
+        random_part = pd.DataFrame({"stratum": stratum[~certain], "pi": pi[~certain]})
+        per_stratum = random_part.groupby("stratum", observed=True, sort=False)["pi"].agg(["size", "mean"])
+
+    moments = pd.DataFrame({
+        "stratum": stratum, "certain": certain, "domain": dom,
+        "wy": wy, "wx": wx, "wy2": wy * wy, "wywx": wy * wx, "wx2": wx * wx, "n": count,
+    }).groupby(["stratum", "certain", "domain"], observed=True, sort=False).sum()
+
+    n_h = per_stratum["size"].to_numpy(dtype=np.float64)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        factor = np.where(n_h > 1, (1 - per_stratum["mean"].to_numpy()) * n_h / (n_h - 1), 0.0)
+    per_stratum = pd.DataFrame({"n_h": n_h, "factor": factor}, index=per_stratum.index)
+    return moments, per_stratum
+
+
+def _estimate(sample, y, x, strata, domain, ratio, confidence, clusters=None):
+    moments, per_stratum = _grouped_moments(sample, y, x, strata, domain, clusters)
+    strata_keys = moments.index.get_level_values("stratum")
+    random = ~moments.index.get_level_values("certain").to_numpy(dtype=bool)
+    n_h = per_stratum["n_h"].reindex(strata_keys).to_numpy()
+    factor = np.where(random, per_stratum["factor"].reindex(strata_keys).fillna(0).to_numpy(), 0.0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        q_yy = factor * (moments["wy2"].to_numpy() - moments["wy"].to_numpy() ** 2 / n_h)
+        q_yx = factor * (moments["wywx"].to_numpy() - moments["wy"].to_numpy() * moments["wx"].to_numpy() / n_h)
+        q_xx = factor * (moments["wx2"].to_numpy() - moments["wx"].to_numpy() ** 2 / n_h)
+    parts = pd.DataFrame({
+        "Y": moments["wy"].to_numpy(), "X": moments["wx"].to_numpy(),
+        "vyy": np.nan_to_num(q_yy), "vyx": np.nan_to_num(q_yx), "vxx": np.nan_to_num(q_xx),
+        "n": moments["n"].to_numpy(),
+    }, index=moments.index.get_level_values("domain"))
+    by_domain = parts.groupby(level=0, observed=True).sum()
+
+    if ratio:
+        estimate = by_domain["Y"] / by_domain["X"]
+        variance = (by_domain["vyy"] - 2 * estimate * by_domain["vyx"] + estimate ** 2 * by_domain["vxx"]) / by_domain["X"] ** 2
+    else:
+        estimate = by_domain["Y"]
+        variance = by_domain["vyy"]
+    se = np.sqrt(variance.clip(lower=0))
+    z = NormalDist().inv_cdf(0.5 + confidence / 2)
+    return pd.DataFrame({
+        "estimate": estimate,
+        "se": se,
+        "cv": se / estimate.abs(),
+        "ci_low": estimate - z * se,
+        "ci_high": estimate + z * se,
+        "n": by_domain["n"].astype(np.int64),
+    })
+
+
+def _combine(results, variables, domain):
+    table = pd.concat(results, keys=variables, names=["variable"])
+    if domain is None:
+        return table.droplevel(1)
+    table.index = table.index.set_names(["variable", domain])
+    return table.swaplevel().sort_index()
+
+
+def ht_totals(sample, variables, strata=None, domain=None, confidence=0.95, clusters=None,
+              frame_strata=None):
+    """HT estimates of population totals of `variables`, overall or by `domain`."""
+    check_strata(sample, strata, frame_strata)
+    check_singletons(sample, strata, clusters)
+    ones = np.ones(len(sample))
+    results = [
+        _estimate(sample, sample[var].to_numpy(dtype=np.float64), ones, strata, domain, False, confidence, clusters)
+        for var in variables
+    ]
+    return _combine(results, list(variables), domain)
+
+
+def ht_means(sample, variables, strata=None, domain=None, confidence=0.95, clusters=None,
+             frame_strata=None):
+    """Per-unit means of `variables` as HT total / estimated number of units (ratio estimator)."""
+    check_strata(sample, strata, frame_strata)
+    check_singletons(sample, strata, clusters)
+    ones = np.ones(len(sample))
+    results = [
+        _estimate(sample, sample[var].to_numpy(dtype=np.float64), ones, strata, domain, True, confidence, clusters)
+        for var in variables
+    ]
+    return _combine(results, list(variables), domain)
+
+
+def ht_ratio(sample, numerator, denominator, strata=None, domain=None, confidence=0.95, clusters=None,
+             frame_strata=None):
+    """Ratio of HT totals, e.g. persons per lodging (`pop_block` / `Lodging`)."""
+    check_strata(sample, strata, frame_strata)
+    check_singletons(sample, strata, clusters)
+    result = _estimate(
+        sample,
+        sample[numerator].to_numpy(dtype=np.float64),
+        sample[denominator].to_numpy(dtype=np.float64),
+        strata, domain, True, confidence, clusters,
+    )
+    return _combine([result], [f"{numerator}/{denominator}"], domain)
@@ -0,0 +1,188 @@
+"""Frame ingest: turns the census-block CSV into a typed columnar store.
+
+The CSV is parsed once into a Parquet file with categorical dtypes for the
+geographic hierarchy and narrow numeric types for the codes and measures.
+Later loads read the Parquet store directly; the store is rebuilt whenever
+the source file changes (size/mtime first, content hash as tie-breaker).
+A Parquet source (e.g. a store copied elsewhere) is read as is, without a store.
+"""
+import hashlib
+import json
+import os
+import warnings
+from pathlib import Path
+
+import pandas as pd
+
+from sondage.instrument import stage
+
+DEFAULT_FRAME_PATH = "Cadre Tunisie.csv"
+STORE_DIR = ".sondage_cache"
+
+CATEGORICAL_COLUMNS = ["Region", "GOVERNORATE", "DELEGATION", "SECTOR", "Area"]
+STRING_COLUMNS = ["Block"]
+CODE_COLUMNS = ["CODE GOUV", "CODE DELEG", "CODE SECTOR", "CODE BLOCK"]
+MEASURE_COLUMNS = ["pop_block", "Lodging"]
+
+# Bump whenever the typing rules below change so that old stores are rebuilt.
+_STORE_FORMAT = 1
+
+
+def frame_version(file_path=DEFAULT_FRAME_PATH):
+    """Cheap identifier of the source file state (mtime + size)."""
+    stat = os.stat(file_path)
+    return f"{stat.st_mtime_ns}-{stat.st_size}"
+
+
+def store_path(file_path=DEFAULT_FRAME_PATH):
+    """Location of the Parquet store built from `file_path`."""
+    source = Path(file_path)
+    return source.parent / STORE_DIR / f"{source.stem}.parquet"
+
+
+def _file_hash(file_path, chunk_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as fh:
+        for chunk in iter(lambda: fh.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _csv_dtypes():
+    dtypes = {col: "category" for col in CATEGORICAL_COLUMNS}
+    dtypes.update({col: "string" for col in STRING_COLUMNS})
+    return dtypes
+
+
+def _read_csv(file_path, **kwargs):
+    try:
+        return pd.read_csv(file_path, encoding="utf-8", **kwargs)
+    except UnicodeDecodeError:
+        warnings.warn(f"UTF-8 decoding failed for {file_path}. Trying 'latin1' encoding.")
+        return pd.read_csv(file_path, encoding="latin1", **kwargs)
+
+
+def optimize_dtypes(df):
+    """Narrows code and measure columns in place and returns the frame."""
+    for col in CODE_COLUMNS:
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], downcast="integer")
+    for col in MEASURE_COLUMNS:
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], downcast="float")
+    return df
+
+
+def read_frame_csv(file_path=DEFAULT_FRAME_PATH):
+    """Parses the CSV straight into the compact dtypes (no object columns)."""
+    df = _read_csv(file_path, dtype=_csv_dtypes())
+    return optimize_dtypes(df)
+
+
+def read_frame_parquet(file_path, columns=None):
+    """Reads a Parquet frame and applies the same dtypes as the CSV parse."""
+    df = pd.read_parquet(file_path, columns=columns, memory_map=True)
+    for col in CATEGORICAL_COLUMNS:
+        if col in df.columns and not isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = df[col].astype("category")
+    for col in STRING_COLUMNS:
+        if col in df.columns:
+            df[col] = df[col].astype("string")
+    return optimize_dtypes(df)
+
+
+def _read_store_meta(meta_path):
+    try:
+        with open(meta_path, encoding="utf-8") as fh:
+            return json.load(fh)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_store_meta(meta_path, meta):
+    tmp_path = meta_path.with_suffix(".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as fh:
+        json.dump(meta, fh)
+    os.replace(tmp_path, meta_path)
+
+
+def write_store(file_path, df, source_hash=None):
+    """Writes `df`, parsed from `file_path`, as its Parquet store with the source metadata."""
+    parquet_path = store_path(file_path)
+    parquet_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = parquet_path.with_suffix(".parquet.tmp")
+    df.to_parquet(tmp_path, engine="pyarrow", index=False)
+    os.replace(tmp_path, parquet_path)
+
+    stat = os.stat(file_path)
+    _write_store_meta(parquet_path.with_suffix(".json"), {
+        "format": _STORE_FORMAT,
+        "mtime_ns": stat.st_mtime_ns,
+        "size": stat.st_size,
+        "sha256": source_hash or _file_hash(file_path),
+    })
+
+
+def build_store(file_path=DEFAULT_FRAME_PATH, source_hash=None):
+    """(Re)builds the Parquet store for `file_path` and returns the parsed frame.
+
+    If the store cannot be written (read-only checkout, missing pyarrow), a
+    warning is issued and the parsed frame is still returned.
+    """
+    df = read_frame_csv(file_path)
+    try:
+        write_store(file_path, df, source_hash=source_hash)
+    except (OSError, ImportError) as exc:
+        warnings.warn(f"Could not write the frame store for {file_path} ({exc}); using the CSV parse.")
+    return df
+
+
+def _store_is_fresh(file_path, parquet_path):
+    """True if the store matches the source; refreshes mtime in the metadata when only it changed."""
+    meta_path = parquet_path.with_suffix(".json")
+    meta = _read_store_meta(meta_path)
+    if meta is None or meta.get("format") != _STORE_FORMAT or not parquet_path.exists():
+        return False, None
+    stat = os.stat(file_path)
+    if meta.get("mtime_ns") == stat.st_mtime_ns and meta.get("size") == stat.st_size:
+        return True, None
+    if meta.get("size") != stat.st_size:
+        return False, None
+    # Same size, different mtime (e.g. a fresh checkout): fall back to the content hash.
+    source_hash = _file_hash(file_path)
+    if meta.get("sha256") != source_hash:
+        return False, source_hash
+    meta["mtime_ns"] = stat.st_mtime_ns
+    _write_store_meta(meta_path, meta)
+    return True, None
+
+
+def load_frame(file_path=DEFAULT_FRAME_PATH, columns=None):
+    """Loads the sampling frame, building or refreshing the columnar store if needed.
+
+    `file_path` is a CSV (with its store) or a Parquet file, read directly.
+    Raises FileNotFoundError if it does not exist. If the store cannot be
+    written (read-only checkout, missing pyarrow), the typed CSV parse is
+    returned instead.
+    """
+    if not os.path.exists(file_path):
+        raise FileNotFoundError(file_path)
+    with stage("load_frame") as timer:
+        df = _load_frame(file_path, columns)
+        timer.rows = len(df)
+    return df
+
+
+def _load_frame(file_path, columns):
+    if Path(file_path).suffix == ".parquet":
+        return read_frame_parquet(file_path, columns=columns)
+    parquet_path = store_path(file_path)
+    try:
+        fresh, source_hash = _store_is_fresh(file_path, parquet_path)
+        if fresh:
+            return pd.read_parquet(parquet_path, columns=columns, memory_map=True)
+    except (OSError, ImportError):
+        source_hash = None
+    with stage("build_store"):
+        df = build_store(file_path, source_hash=source_hash)
+    return df[columns] if columns is not None else df
@@ -0,0 +1,208 @@
+"""Stage-level instrumentation: wall time, CPU time, peak memory and row counts.
+
+Code marks its stages with ``with stage("allocation", rows=N):``. Without an
+active `Profiler` this costs two context-variable lookups; with one, every
+stage is recorded on the profiler, logged as one JSON line on the
+`sondage.perf` logger and added to process-wide totals that
+`write_prometheus` exports in the Prometheus text format. Stages nest: a
+stage's name is prefixed with its parents' names ('draw/allocation').
+
+CPU time is the calling thread's, plus what pool workers report for the
+stage: code that hands work to a pool wraps the task with `cpu_timed` and
+passes the workers' CPU seconds to `add_worker_cpu`. Peak memory
+(tracemalloc: Python and NumPy allocations, relative to the start of the
+stage) is only measured for profilers created with memory=True, because
+tracing slows allocation-heavy code down.
+"""
+import contextvars
+import json
+import logging
+import os
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from functools import partial
+
+import pandas as pd
+
+logger = logging.getLogger("sondage.perf")
+PROMETHEUS_ENV = "SONDAGE_PROMETHEUS_FILE"
+RECORD_COLUMNS = ["stage", "start_s", "wall_s", "cpu_s", "peak_mib", "rows"]
+
+_active = contextvars.ContextVar("sondage_profiler", default=None)
+_totals = {}
+_totals_lock = threading.Lock()
+
+
+class _Stage:
+    __slots__ = ("path", "rows", "labels", "peak", "worker_cpu")
+
+    def __init__(self, path, rows, labels):
+        self.path = path
+        self.rows = rows
+        self.labels = labels
+        self.peak = 0
+        self.worker_cpu = 0.0
+
+
+class Profiler:
+    """Records of the stages run while it is active (see `profiling` and `activate`)."""
+
+    def __init__(self, memory=False):
+        self.memory = memory
+        self.records = []
+        self._stack = []
+        self._origin = time.perf_counter()
+        self._started_tracing = False
+
+    def activate(self):
+        """Makes this the active profiler of the current context (e.g. for one Streamlit script run)."""
+        _active.set(self)
+        return self
+
+    def to_frame(self):
+        """Records as a DataFrame in start order (labels as extra columns)."""
+        if not self.records:
+            return pd.DataFrame(columns=RECORD_COLUMNS)
+        return pd.DataFrame(self.records).sort_values("start_s", kind="stable").reset_index(drop=True)
+
+
+@contextmanager
+def profiling(profiler=None):
+    """Activates `profiler` (a new one by default) for the duration of the block."""
+    profiler = profiler if profiler is not None else Profiler()
+    token = _active.set(profiler)
+    try:
+        yield profiler
+    finally:
+        _active.reset(token)
+
+
+def _to_json(value):
+    return value.item() if hasattr(value, "item") else str(value)
+
+
+@contextmanager
+def stage(name, rows=None, **labels):
+    """Times the block as stage `name`; `rows` (or `handle.rows`, set inside the block) is recorded with it."""
+    profiler = _active.get()
+    if profiler is None:
+        yield _Stage(name, rows, labels)
+        return
+
+    parent = profiler._stack[-1] if profiler._stack else None
+    handle = _Stage(f"{parent.path}/{name}" if parent else name, rows, labels)
+    if profiler.memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+        profiler._started_tracing = True
+    tracing = profiler.memory and tracemalloc.is_tracing()
+    if tracing:
+        current, peak = tracemalloc.get_traced_memory()
+        if parent is not None:
+            parent.peak = max(parent.peak, peak)
+        tracemalloc.reset_peak()
+    profiler._stack.append(handle)
+    start = time.perf_counter()
+    cpu_start = time.thread_time()
+    try:
+        yield handle
+    finally:
+        wall = time.perf_counter() - start
+        cpu = time.thread_time() - cpu_start + handle.worker_cpu
+        profiler._stack.pop()
+        if parent is not None:
+            parent.worker_cpu += handle.worker_cpu
+        peak_mib = None
+        if tracing:
+            absolute = max(handle.peak, tracemalloc.get_traced_memory()[1])
+            peak_mib = (absolute - current) / 2**20
+            if parent is not None:
+                parent.peak = max(parent.peak, absolute)
+            elif profiler._started_tracing:
+                tracemalloc.stop()
+                profiler._started_tracing = False
+        record = {
+            "stage": handle.path, "start_s": start - profiler._origin, "wall_s": wall, "cpu_s": cpu,
+            "peak_mib": peak_mib, "rows": handle.rows, **handle.labels,
+        }
+        profiler.records.append(record)
+        _add_to_totals(record)
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(json.dumps({"event": "stage", **record}, default=_to_json))
+
+
+def _call_cpu_timed(func, *args, **kwargs):
+    start = time.thread_time()
+    result = func(*args, **kwargs)
+    return result, time.thread_time() - start
+
+
+def cpu_timed(func):
+    """Wraps `func` to return `(result, CPU seconds of the thread that ran it)`; picklable if `func` is."""
+    return partial(_call_cpu_timed, func)
+
+
+def add_worker_cpu(seconds):
+    """Adds CPU time spent by pool workers to the innermost active stage (and, on exit, to its parents)."""
+    profiler = _active.get()
+    if profiler is not None and profiler._stack:
+        profiler._stack[-1].worker_cpu += seconds
+
+
+def _add_to_totals(record):
+    with _totals_lock:
+        totals = _totals.setdefault(record["stage"], {"calls": 0, "wall": 0.0, "cpu": 0.0, "rows": 0, "peak": 0.0})
+        totals["calls"] += 1
+        totals["wall"] += record["wall_s"]
+        totals["cpu"] += record["cpu_s"]
+        totals["rows"] += int(record["rows"] or 0)
+        if record["peak_mib"] is not None:
+            totals["peak"] = max(totals["peak"], record["peak_mib"] * 2**20)
+
+
+def configure_logging(stream=None):
+    """Sends `sondage.perf` records, one JSON object per line, to `stream` (stderr by default); idempotent."""
+    if not any(getattr(h, "_sondage_perf", False) for h in logger.handlers):
+        handler = logging.StreamHandler(stream)
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        handler._sondage_perf = True
+        logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    return logger
+
+
+_METRICS = (
+    ("sondage_stage_calls_total", "counter", "Number of times the stage ran.", "calls"),
+    ("sondage_stage_seconds_total", "counter", "Wall-clock time spent in the stage.", "wall"),
+    ("sondage_stage_cpu_seconds_total", "counter", "CPU time spent in the stage (calling thread and pool workers).", "cpu"),
+    ("sondage_stage_rows_total", "counter", "Rows processed by the stage.", "rows"),
+    ("sondage_stage_peak_bytes", "gauge", "Largest traced peak memory of the stage.", "peak"),
+)
+
+
+def prometheus_text():
+    """Process-wide stage totals in the Prometheus text exposition format."""
+    with _totals_lock:
+        totals = {name: dict(values) for name, values in _totals.items()}
+    lines = []
+    for metric, kind, help_text, key in _METRICS:
+        lines.append(f"# HELP {metric} {help_text}")
+        lines.append(f"# TYPE {metric} {kind}")
+        for name in sorted(totals):
+            label = name.replace("\\", "\\\\").replace('"', '\\"')
+            lines.append(f'{metric}{{stage="{label}"}} {totals[name][key]:g}')
+    return "\n".join(lines) + "\n"
+
+
+def write_prometheus(path=None):
+    """Atomically writes `prometheus_text()` to `path` (default: $SONDAGE_PROMETHEUS_FILE); returns the path or None."""
+    path = path or os.environ.get(PROMETHEUS_ENV)
+    if not path:
+        return None
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as fh:
+        fh.write(prometheus_text())
+    os.replace(tmp_path, path)
+    return path
@@ -0,0 +1,206 @@
+"""Multi-stage cluster sampling over the geographic hierarchy GOUV -> DELEG -> SECTOR -> BLOCK.
+
+The hierarchy is indexed once from the code columns: frame rows are ordered
+by (CODE GOUV, CODE DELEG, CODE SECTOR) and, for every level, the units are
+stored with their aggregated `pop_block` and CSR offsets to their children
+at the next level. Descendants of a unit are therefore a contiguous range at
+every lower level, and each stage of a draw only reads the children of the
+units selected at the previous stage.
+
+A design is a list of `Stage(level, n, method)`: `n` units are drawn in every
+unit selected at the previous stage (in the whole frame for the first stage),
+by SRSWOR ('srs') or systematic PPS on `pop_block` ('pps'); `n=None` takes
+every unit (a leading take-all stage stratifies the design). Units with
+fewer children than `n` are taken in full. If the last stage is above the
+block level, every block of the selected units is taken (cluster sampling).
+The inclusion probability of a block is the product of its conditional
+inclusion probabilities at every stage.
+"""
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+
+from sondage.sampling import PPSFrame, StratumIndex, pps_systematic_positions, stratified_positions, with_design
+
+HIERARCHY = ("CODE GOUV", "CODE DELEG", "CODE SECTOR")
+BLOCK_LEVEL = "CODE BLOCK"
+LEVELS = HIERARCHY + (BLOCK_LEVEL,)
+# Level names as shown to users, for each code column.
+LEVEL_NAMES = {"CODE GOUV": "GOVERNORATE", "CODE DELEG": "DELEGATION", "CODE SECTOR": "SECTOR", "CODE BLOCK": "Block"}
+STAGE_METHODS = ("srs", "pps")
+
+
+class Stage(NamedTuple):
+    level: str
+    n: int = None
+    method: str = "srs"
+
+
+class HierarchyIndex(NamedTuple):
+    """Units of every hierarchy level in hierarchy order, CSR-linked to their children.
+
+    Level l (0 = governorates, len(levels) = blocks) has `len(sizes[l])`
+    units; the children of unit u of level l < len(levels) are the units
+    offsets[l][u]:offsets[l][u + 1] of level l + 1. Block u is the frame row
+    positions[u].
+    """
+
+    levels: tuple
+    codes: tuple
+    offsets: tuple
+    sizes: tuple
+    positions: np.ndarray
+
+    def level_id(self, level):
+        """Depth of `level` (a code column of `levels`, or CODE BLOCK for the blocks)."""
+        if level == BLOCK_LEVEL:
+            return len(self.levels)
+        if level not in self.levels:
+            raise ValueError(f"Unknown hierarchy level '{level}'. Expected one of {self.levels + (BLOCK_LEVEL,)}.")
+        return self.levels.index(level)
+
+    def descendants(self, level_id, lo, hi, target_id):
+        """Ranges [lo, hi) at level `target_id` covered by the unit ranges [lo, hi) of level `level_id`."""
+        for depth in range(level_id, target_id):
+            lo, hi = self.offsets[depth][lo], self.offsets[depth][hi]
+        return lo, hi
+
+
+def build_hierarchy_index(df, levels=HIERARCHY, size_col="pop_block"):
+    """Orders the blocks by their code columns and aggregates `size_col` at every level (one sort of the frame)."""
+    if len(df) == 0:
+        raise ValueError("Cannot index an empty frame.")
+    keys = [df[col].to_numpy() for col in levels]
+    if any(pd.isna(k).any() for k in keys):
+        raise ValueError(f"Hierarchy codes {list(levels)} must not be missing.")
+    # lexsort uses the last key as the primary one; it is stable, so blocks keep frame order within a sector.
+    order = np.lexsort(keys[::-1])
+    block_sizes = df[size_col].to_numpy(dtype=np.float64)[order]
+    if np.any(~np.isfinite(block_sizes)) or np.any(block_sizes < 0):
+        raise ValueError(f"'{size_col}' must be finite and non-negative.")
+
+    N = len(order)
+    change = np.zeros(N - 1, dtype=bool)
+    starts = []
+    for key in keys:
+        sorted_key = key[order]
+        change |= sorted_key[1:] != sorted_key[:-1]
+        starts.append(np.flatnonzero(np.r_[True, change]))
+
+    codes, offsets, sizes = [], [], []
+    for depth, level_starts in enumerate(starts):
+        codes.append(keys[depth][order[level_starts]])
+        sizes.append(np.add.reduceat(block_sizes, level_starts))
+        row_bounds = np.r_[level_starts, N]
+        offsets.append(row_bounds if depth == len(starts) - 1 else np.searchsorted(starts[depth + 1], row_bounds))
+    return HierarchyIndex(
+        levels=tuple(levels),
+        codes=tuple(codes),
+        offsets=tuple(offsets),
+        sizes=tuple(sizes) + (block_sizes,),
+        positions=order.astype(np.int64),
+    )
+
+
+def _select(hierarchy, depth, lo, hi, n, method, rng):
+    """Draws `n` units of level `depth` in every range [lo, hi); returns (unit ids, range of each, conditional pi)."""
+    counts = hi - lo
+    take = counts if n is None else np.minimum(n, counts)
+    units = np.repeat(lo, counts) + np.arange(int(counts.sum())) - np.repeat(np.cumsum(counts) - counts, counts)
+    offsets = np.zeros(len(counts) + 1, dtype=np.int64)
+    np.cumsum(counts, out=offsets[1:])
+    groups = StratumIndex(keys=pd.RangeIndex(len(counts)), offsets=offsets, positions=units)
+    n_h = pd.Series(take, index=groups.keys)
+    seed = rng.integers(2**63)
+
+    if n is None or method == "srs":
+        selected = units if n is None else stratified_positions(groups, n_h, seed=seed)
+        group = np.searchsorted(lo, selected, side="right") - 1
+        return selected, group, take[group] / counts[group]
+
+    sizes = hierarchy.sizes[depth][units]
+    cumulative = np.zeros(len(sizes) + 1, dtype=np.float64)
+    np.cumsum(sizes, out=cumulative[1:])
+    largest = np.maximum.reduceat(sizes, offsets[:-1])
+    selected, pi = pps_systematic_positions(PPSFrame(groups, sizes, cumulative, largest), n_h, seed=seed)
+    return selected, np.searchsorted(lo, selected, side="right") - 1, pi
+
+
+def validate_stages(stages, levels=HIERARCHY):
+    """Checks that stages go strictly down the hierarchy; appends a take-all block stage if needed."""
+    stages = [Stage(*stage) for stage in stages]
+    if not stages:
+        raise ValueError("A multi-stage design needs at least one stage.")
+    all_levels = tuple(levels) + (BLOCK_LEVEL,)
+    depths = []
+    for stage in stages:
+        if stage.level not in all_levels:
+            raise ValueError(f"Unknown hierarchy level '{stage.level}'. Expected one of {all_levels}.")
+        if stage.method not in STAGE_METHODS:
+            raise ValueError(f"Unknown stage method '{stage.method}'. Expected one of {STAGE_METHODS}.")
+        if stage.n is not None and (int(stage.n) != stage.n or stage.n < 1):
+            raise ValueError(f"Stage sample sizes must be positive integers (got {stage.n} at {stage.level}).")
+        depths.append(all_levels.index(stage.level))
+    if any(b <= a for a, b in zip(depths, depths[1:])):
+        raise ValueError("Stages must go strictly down the hierarchy (GOUV -> DELEG -> SECTOR -> BLOCK).")
+    if stages[-1].level != BLOCK_LEVEL:
+        stages.append(Stage(BLOCK_LEVEL, None))
+    return stages
+
+
+def multistage_positions(hierarchy, stages, seed=None):
+    """Frame row positions and inclusion probabilities of a multi-stage draw (see module docstring)."""
+    rng = np.random.default_rng(seed)
+    stages = validate_stages(stages, hierarchy.levels)
+    # The first stage draws within the single range of all top-level units.
+    depth = 0
+    lo = np.zeros(1, dtype=np.int64)
+    hi = np.array([len(hierarchy.sizes[0])], dtype=np.int64)
+    pi = np.ones(1)
+    for stage in stages:
+        target = hierarchy.level_id(stage.level)
+        lo, hi = hierarchy.descendants(depth, lo, hi, target)
+        units, group, stage_pi = _select(hierarchy, target, lo, hi, stage.n, stage.method, rng)
+        pi = pi[group] * stage_pi
+        lo, hi, depth = units, units + 1, target
+    positions = hierarchy.positions[lo]
+    order = np.argsort(positions)
+    return positions[order], pi[order]
+
+
+def draw_multistage(df, stages, seed=None, hierarchy=None):
+    """Multi-stage sample of `df` in frame order, with `pi` and `weight` columns.
+
+    A prebuilt `hierarchy` (from `build_hierarchy_index`) can be passed in to
+    reuse it across draws.
+    """
+    hierarchy = hierarchy if hierarchy is not None else build_hierarchy_index(df)
+    positions, pi = multistage_positions(hierarchy, stages, seed=seed)
+    return with_design(df, positions, pi)
+
+
+def variance_design(stages):
+    """(strata, clusters) columns for `ht_totals` & co: the last leading take-all level and the first sampled one."""
+    strata = clusters = None
+    for stage in validate_stages(stages):
+        if stage.n is not None:
+            clusters = stage.level if stage.level != BLOCK_LEVEL else None
+            break
+        strata = stage.level
+    return strata, clusters
+
+
+def parse_stages(spec):
+    """Parses 'SECTOR:pps:100,Block:srs:5' (level name or code column, method, n or 'all') into stages."""
+    codes = {name: code for code, name in LEVEL_NAMES.items()}
+    stages = []
+    for part in spec.split(","):
+        fields = [field.strip() for field in part.split(":")]
+        if len(fields) == 2 and fields[1] == "all":
+            fields = [fields[0], "srs", "all"]
+        if len(fields) != 3:
+            raise ValueError(f"Invalid stage '{part}': expected LEVEL:METHOD:N (or LEVEL:all).")
+        level, method, n = fields
+        stages.append(Stage(codes.get(level, level), None if n == "all" else int(n), method))
+    return validate_stages(stages)
@@ -0,0 +1,79 @@
+"""Frame profile: everything the UI shows about the frame itself, computed once per frame version.
+
+Cardinalities, dtypes, `info()`/`describe()` output and the frame
+proportions of every comparison candidate depend only on the frame, so they
+are computed in one go and cached in memory and next to the columnar store.
+"""
+import pickle
+from io import StringIO
+from typing import NamedTuple
+
+import pandas as pd
+
+from sondage.frame import store_path
+from sondage.tables import frame_proportions, is_comparison_candidate
+
+_PROFILES = {}
+
+
+class FrameProfile(NamedTuple):
+    version: str
+    shape: tuple
+    dtypes: pd.Series
+    cardinalities: pd.Series
+    info: str
+    describe: pd.DataFrame
+    comparison_candidates: list
+    proportions: dict
+
+
+def build_profile(df, version):
+    """Computes the profile of `df` (one `nunique` and one `value_counts` per column)."""
+    cardinalities = df.nunique()
+    candidates = [
+        col for col in df.columns if is_comparison_candidate(col, cardinalities[col], df[col].dtype)
+    ] or ["Area"]
+    buffer = StringIO()
+    df.info(buf=buffer)
+    return FrameProfile(
+        version=version,
+        shape=df.shape,
+        dtypes=df.dtypes,
+        cardinalities=cardinalities,
+        info=buffer.getvalue(),
+        describe=df.describe(),
+        comparison_candidates=candidates,
+        proportions={col: frame_proportions(df, col) for col in candidates},
+    )
+
+
+def profile_path(file_path):
+    """On-disk location of the profile of the frame read from `file_path`."""
+    return store_path(file_path).with_suffix(".profile.pkl")
+
+
+def load_profile(df, file_path, version):
+    """Profile of `df` for this frame version: from memory, then disk, else computed and saved."""
+    key = (str(file_path), version)
+    if key in _PROFILES:
+        return _PROFILES[key]
+    path = profile_path(file_path)
+    profile = None
+    try:
+        with open(path, "rb") as fh:
+            cached = pickle.load(fh)
+        if isinstance(cached, FrameProfile) and cached.version == version:
+            profile = cached
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError, TypeError, ImportError):
+        # Unreadable or written by other library versions (ImportError covers ModuleNotFoundError): rebuild.
+        pass
+    if profile is None:
+        profile = build_profile(df, version)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            with open(path, "wb") as fh:
+                pickle.dump(profile, fh)
+        except OSError:
+            pass
+    _PROFILES[key] = profile
+    return profile
@@ -0,0 +1,132 @@
+"""Monte Carlo evaluation of a sampling design.
+
+`replicate_estimates` draws R independent samples of a SAS or stratified
+design and returns the estimate of the per-block mean of each study variable
+for every replicate. Replicates are generated in fixed-size batches as
+index matrices (one row per replicate), each batch with its own child of the
+seed, so results depend only on the seed and `batch_size`, never on the
+number of workers (a different `batch_size` splits the seed differently).
+
+A stratified design whose allocation leaves strata without any unit gives a
+biased estimator (those strata contribute nothing): `design_arrays` warns
+about it and `replication_summary` reports the design effect on the mean
+squared error as well as on the variance.
+"""
+import multiprocessing
+import warnings
+
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from sondage.allocation import allocate_frame, empty_strata
+from sondage.estimation import DEFAULT_VARIABLES, EmptyStrataWarning
+from sondage.instrument import add_worker_cpu, cpu_timed
+from sondage.sampling import build_stratum_index, srs_index_matrix
+
+BATCH_SIZE = 500
+
+# Design arrays installed once per worker process by `_init_worker`.
+_WORKER_DESIGN = None
+
+
+def _init_worker(design):
+    global _WORKER_DESIGN
+    _WORKER_DESIGN = design
+
+
+def _estimate_batch(design, n_replicates, seed_seq):
+    """Per-block mean estimates (R x k) for one batch of replicates."""
+    ordered, offsets, counts, weights = design
+    rng = np.random.default_rng(seed_seq)
+    estimates = np.zeros((n_replicates, ordered.shape[1]))
+    for h in np.flatnonzero(counts):
+        local = srs_index_matrix(int(offsets[h + 1] - offsets[h]), int(counts[h]), n_replicates, rng)
+        estimates += weights[h] * ordered[offsets[h] + local].mean(axis=1)
+    return estimates
+
+
+def _estimate_batch_in_worker(args):
+    return _estimate_batch(_WORKER_DESIGN, *args)
+
+
+def design_arrays(df, n, strat_var=None, allocation="proportional", variables=DEFAULT_VARIABLES, min_per_stratum=0):
+    """Study variables in stratum order plus the stratum offsets, sizes n_h and weights N_h / N.
+
+    A SAS design is a single stratum with weight 1. Warns (EmptyStrataWarning)
+    when the allocation leaves strata without any unit.
+    """
+    values = df[list(variables)].to_numpy(dtype=np.float64)
+    if strat_var is None:
+        offsets = np.array([0, len(df)], dtype=np.int64)
+        return values, offsets, np.array([n], dtype=np.int64), np.array([1.0])
+    index = build_stratum_index(df, strat_var)
+    table = allocate_frame(df, strat_var, n, method=allocation, min_per_stratum=min_per_stratum)
+    empty = empty_strata(table)
+    if len(empty):
+        warnings.warn(
+            f"{len(empty)} of {len(table)} strata of '{strat_var}' are allocated no unit; the stratified "
+            "estimator leaves them out and is biased (see the MSE-based design effect).",
+            EmptyStrataWarning, stacklevel=3,
+        )
+    n_h = table["n_h"]
+    counts = np.zeros(len(index.keys), dtype=np.int64)
+    counts[index.stratum_ids(n_h.index)] = n_h.to_numpy()
+    weights = index.sizes / index.sizes.sum()
+    return values[index.positions], index.offsets, counts, weights
+
+
+def replicate_estimates(df, n, strat_var=None, allocation="proportional", R=1000, seed=None,
+                        variables=DEFAULT_VARIABLES, workers=1, batch_size=BATCH_SIZE, min_per_stratum=0):
+    """Estimated per-block means of `variables` over R replicates of the design (R x k DataFrame).
+
+    SAS when `strat_var` is None, otherwise stratified SRSWOR with the given
+    allocation and the estimator sum_h (N_h / N) * mean_h. With workers > 1
+    the batches run on a process pool that receives the frame arrays once
+    per worker.
+    """
+    design = design_arrays(df, n, strat_var=strat_var, allocation=allocation, variables=variables,
+                           min_per_stratum=min_per_stratum)
+    batches = [min(batch_size, R - start) for start in range(0, R, batch_size)]
+    seeds = np.random.SeedSequence(seed).spawn(len(batches))
+    if workers > 1 and len(batches) > 1:
+        # Spawned, not forked: forking a multithreaded process (e.g. the Streamlit server) can deadlock.
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+                                 initializer=_init_worker, initargs=(design,)) as pool:
+            timed = list(pool.map(cpu_timed(_estimate_batch_in_worker), zip(batches, seeds)))
+        results = [result for result, _ in timed]
+        add_worker_cpu(sum(cpu for _, cpu in timed))
+    else:
+        results = [_estimate_batch(design, size, seq) for size, seq in zip(batches, seeds)]
+    estimates = np.concatenate(results) if results else np.empty((0, len(variables)))
+    return pd.DataFrame(estimates, columns=list(variables))
+
+
+def replication_summary(estimates, df, n):
+    """Empirical distribution of the replicate estimates against the frame values.
+
+    The design effect compares the empirical variance of the estimates with
+    the exact SRSWOR variance (1 - n/N) S^2 / n of a SAS sample of the same n.
+    `deff_mse` uses the mean squared error (variance + bias^2) instead, so a
+    biased design (e.g. strata allocated no unit) is not reported as efficient.
+    """
+    N = len(df)
+    frame_values = df[list(estimates.columns)].astype(np.float64)
+    true_mean = frame_values.mean()
+    srs_variance = (1 - n / N) * frame_values.var(ddof=1) / n
+    variance = estimates.var(ddof=1)
+    mse = ((estimates - true_mean) ** 2).mean()
+    return pd.DataFrame({
+        "true_mean": true_mean,
+        "mean_estimate": estimates.mean(),
+        "bias": estimates.mean() - true_mean,
+        "sd": np.sqrt(variance),
+        "q025": estimates.quantile(0.025),
+        "q975": estimates.quantile(0.975),
+        "srs_variance": srs_variance,
+        "variance": variance,
+        "deff": variance / srs_variance,
+        "mse": mse,
+        "deff_mse": mse / srs_variance,
+    })
@@ -0,0 +1,120 @@
+"""Bounded cache of draw results and of their download artifacts.
+
+Results are keyed by everything that determines a draw (frame version,
+method, n, stratification variable, allocation, seed, stages, design grid),
+so re-running a design that is still in the cache costs nothing. Download
+artifacts (CSV, Parquet, PNG, ZIP) are only produced when first requested,
+written to disk in a streaming way and memoized alongside their result;
+evicting a result deletes its artifact files.
+"""
+import os
+import shutil
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import NamedTuple
+
+import pandas as pd
+
+CSV_CHUNK_ROWS = 50_000
+
+
+class DrawKey(NamedTuple):
+    version: str
+    method: str
+    n: int
+    strat_var: str = None
+    allocation: str = None
+    seed: int = None
+    replicates: int = None
+    stages: tuple = None
+    designs: tuple = None
+    min_per_stratum: int = 0
+
+
+class ResultStore:
+    """Thread-safe LRU cache of results and their lazily built artifact files."""
+
+    def __init__(self, maxsize=32, directory=None):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.RLock()
+        self._directory = directory or tempfile.mkdtemp(prefix="sondage-artifacts-")
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get_or_compute(self, key, compute):
+        """Cached result for `key`, computing (and caching) it with `compute()` on a miss."""
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return self._entries[key]["result"]
+        result = compute()
+        with self._lock:
+            self._entries[key] = {"result": result, "artifacts": {}}
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                _, evicted = self._entries.popitem(last=False)
+                for path in evicted["artifacts"].values():
+                    _remove(path)
+        return result
+
+    def artifact_path(self, key, name):
+        """Path of an already built artifact, or None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry["artifacts"].get(name) if entry is not None else None
+
+    def artifact(self, key, name, write):
+        """Path of artifact `name` of result `key`, built once with `write(path)`.
+
+        Returns None if `key` is not (or no longer) cached: files are only
+        kept for cached results, so that eviction can delete them.
+        """
+        path = self.artifact_path(key, name)
+        if path is not None:
+            return path
+        fd, path = tempfile.mkstemp(dir=self._directory, suffix=os.path.splitext(name)[1])
+        os.close(fd)
+        try:
+            write(path)
+        except BaseException:
+            _remove(path)
+            raise
+        with self._lock:
+            entry = self._entries.get(key)
+            kept = entry["artifacts"].setdefault(name, path) if entry is not None else None
+        if kept != path:
+            # Evicted meanwhile, or another caller built the same artifact first.
+            _remove(path)
+        return kept
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            shutil.rmtree(self._directory, ignore_errors=True)
+            os.makedirs(self._directory, exist_ok=True)
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def _for_export(df):
+    """Named or non-default indexes become columns, as in the app's CSV downloads."""
+    if isinstance(df.index, pd.MultiIndex) or df.index.name is not None or not isinstance(df.index, pd.RangeIndex):
+        return df.reset_index()
+    return df
+
+
+def write_csv(df, path, chunk_rows=CSV_CHUNK_ROWS):
+    """Writes `df` as UTF-8 CSV, `chunk_rows` rows at a time (no full in-memory copy of the text)."""
+    _for_export(df).to_csv(path, index=False, encoding="utf-8", chunksize=chunk_rows)
+
+
+def write_parquet(df, path):
+    _for_export(df).to_parquet(path, index=False)
@@ -0,0 +1,299 @@
+"""Sample selection on positional row indices.
+
+Draws return integer row positions into the frame; the `draw_*` helpers
+materialize the sample with a single `df.take(positions)` and attach each
+unit's inclusion probability and design weight (`pi`, `weight` = 1 / pi).
+The stratified draw works on a `StratumIndex` (rows grouped by stratum,
+CSR-style) that is built once per frame and stratification variable, so no
+per-stratum boolean mask is needed.
+"""
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+
+# Design columns attached to every drawn sample.
+PI_COLUMN = "pi"
+WEIGHT_COLUMN = "weight"
+DESIGN_COLUMNS = (PI_COLUMN, WEIGHT_COLUMN)
+
+
+class StratumIndex(NamedTuple):
+    """Row positions grouped by stratum: rows of stratum h are positions[offsets[h]:offsets[h + 1]]."""
+
+    keys: pd.Index
+    offsets: np.ndarray
+    positions: np.ndarray
+
+    @property
+    def sizes(self):
+        return np.diff(self.offsets)
+
+    def stratum_ids(self, labels):
+        """Segment ids of the given stratum labels (KeyError if a label is unknown)."""
+        ids = self.keys.get_indexer(pd.Index(labels))
+        if np.any(ids < 0):
+            missing = list(pd.Index(labels)[ids < 0])
+            raise KeyError(f"Unknown strata: {missing}")
+        return ids
+
+
+def build_stratum_index(df, strat_var):
+    """Groups row positions by the values of `strat_var` (missing values are left out)."""
+    column = df[strat_var]
+    if isinstance(column.dtype, pd.CategoricalDtype):
+        codes = column.cat.codes.to_numpy()
+        keys = pd.Index(column.cat.categories)
+    else:
+        codes, keys = pd.factorize(column, sort=True)
+        keys = pd.Index(keys)
+    # Stable sort on small integer codes is a radix sort: linear in N and keeps frame order within strata.
+    order = np.argsort(codes, kind="stable")
+    counts = np.bincount(codes[codes >= 0], minlength=len(keys))
+    n_missing = len(codes) - int(counts.sum())
+    offsets = np.zeros(len(keys) + 1, dtype=np.int64)
+    np.cumsum(counts, out=offsets[1:])
+    return StratumIndex(keys=keys, offsets=offsets, positions=order[n_missing:].astype(np.int64))
+
+
+def _distinct_offsets(sizes, counts, rng):
+    """For each stratum h, `counts[h]` distinct offsets in [0, sizes[h]) (requires counts <= sizes / 2).
+
+    Offsets are drawn with replacement, de-duplicated, and only the shortfall is
+    redrawn; by symmetry the resulting sets are uniform over subsets. Returns
+    (stratum ids, offsets) sorted by stratum then offset.
+    """
+    starts = np.zeros(len(sizes) + 1, dtype=np.int64)
+    np.cumsum(sizes, out=starts[1:])
+    drawn = np.empty(0, dtype=np.int64)
+    deficit = counts.astype(np.int64)
+    while deficit.any():
+        strata = np.repeat(np.arange(len(sizes)), deficit)
+        new = starts[strata] + (rng.random(len(strata)) * sizes[strata]).astype(np.int64)
+        drawn = np.unique(np.concatenate([drawn, new]))
+        got = np.bincount(np.searchsorted(starts, drawn, side="right") - 1, minlength=len(sizes))
+        deficit = counts - got
+    strata = np.searchsorted(starts, drawn, side="right") - 1
+    return strata, drawn - starts[strata]
+
+
+def stratified_positions(index, n_h, seed=None):
+    """Simple random samples without replacement of n_h rows in every stratum, in one pass.
+
+    `n_h` is a Series indexed by stratum label (e.g. the allocation table's
+    `n_h` column). Returns the frame row positions of the sample, grouped by
+    stratum.
+    """
+    rng = np.random.default_rng(seed)
+    ids = index.stratum_ids(n_h.index)
+    counts = np.zeros(len(index.keys), dtype=np.int64)
+    counts[ids] = np.asarray(n_h, dtype=np.int64)
+    sizes = index.sizes
+    if np.any(counts > sizes) or np.any(counts < 0):
+        raise ValueError("Stratum sample sizes must be between 0 and the stratum size.")
+
+    # Sparse strata: draw the selected offsets. Dense strata: draw the excluded
+    # offsets and keep the complement, so the work stays O(n_h) per stratum.
+    dense = 2 * counts > sizes
+    draw_counts = np.where(dense, sizes - counts, counts)
+    strata, offsets = _distinct_offsets(sizes, draw_counts, rng)
+
+    keep_sparse = ~dense[strata]
+    selected = index.offsets[strata[keep_sparse]] + offsets[keep_sparse]
+
+    dense_ids = np.flatnonzero(dense)
+    if len(dense_ids):
+        dense_sizes = sizes[dense_ids]
+        # Every row of the dense strata, as (stratum, offset) pairs.
+        rows_stratum = np.repeat(dense_ids, dense_sizes)
+        local_starts = np.zeros(len(dense_ids) + 1, dtype=np.int64)
+        np.cumsum(dense_sizes, out=local_starts[1:])
+        rows_offset = np.arange(local_starts[-1]) - np.repeat(local_starts[:-1], dense_sizes)
+        keep = np.ones(len(rows_stratum), dtype=bool)
+        excluded = ~keep_sparse
+        slot = np.searchsorted(dense_ids, strata[excluded])
+        keep[local_starts[slot] + offsets[excluded]] = False
+        dense_selected = index.offsets[rows_stratum[keep]] + rows_offset[keep]
+        selected = np.sort(np.concatenate([selected, dense_selected]))
+
+    return index.positions[selected]
+
+
+class PPSFrame(NamedTuple):
+    """Size measure laid out in stratum order with its running total, for PPS selection.
+
+    `cumulative` has N + 1 entries: unit i of the ordered frame covers
+    [cumulative[i], cumulative[i + 1]).
+    """
+
+    index: StratumIndex
+    sizes: np.ndarray
+    cumulative: np.ndarray
+    largest: np.ndarray
+
+    @property
+    def totals(self):
+        return self.cumulative[self.index.offsets[1:]] - self.cumulative[self.index.offsets[:-1]]
+
+
+def build_pps_frame(df, size_col="pop_block", strat_var=None):
+    """Precomputes the ordered sizes and running totals used by `pps_systematic_positions`.
+
+    The frame's own 'Cumulative population' column is not used: it runs over
+    the full census (per governorate, with gaps), not over the rows present.
+    Units keep frame order within each stratum, i.e. the geographic order of
+    the codes, which gives systematic selection its implicit stratification.
+    """
+    if strat_var is None:
+        index = StratumIndex(
+            keys=pd.Index(["all"]),
+            offsets=np.array([0, len(df)], dtype=np.int64),
+            positions=np.arange(len(df), dtype=np.int64),
+        )
+    else:
+        index = build_stratum_index(df, strat_var)
+    sizes = df[size_col].to_numpy(dtype=np.float64)[index.positions]
+    if np.any(~np.isfinite(sizes)) or np.any(sizes < 0):
+        raise ValueError(f"'{size_col}' must be finite and non-negative for PPS selection.")
+    cumulative = np.zeros(len(sizes) + 1, dtype=np.float64)
+    np.cumsum(sizes, out=cumulative[1:])
+    largest = np.zeros(len(index.keys), dtype=np.float64)
+    non_empty = index.sizes > 0
+    if non_empty.any():
+        largest[non_empty] = np.maximum.reduceat(sizes, index.offsets[:-1][non_empty])
+    return PPSFrame(index=index, sizes=sizes, cumulative=cumulative, largest=largest)
+
+
+def _systematic_with_certainty(sizes, n, rng):
+    """PPS systematic selection in one stratum where some units have n * x_i / X >= 1.
+
+    Such units are taken with certainty (iteratively, as removing them raises
+    the others' probabilities); the remaining slots are filled systematically.
+    Returns local offsets and inclusion probabilities of the selected units.
+    """
+    certain = np.zeros(len(sizes), dtype=bool)
+    while True:
+        slots = n - int(certain.sum())
+        rest_total = sizes[~certain].sum()
+        if slots == 0:
+            break
+        if rest_total <= 0:
+            raise ValueError(f"Cannot select {n} units with positive size from this stratum.")
+        new = ~certain & (sizes * slots >= rest_total)
+        if not new.any():
+            break
+        certain |= new
+    pi = np.where(certain, 1.0, sizes * slots / rest_total if slots else 0.0)
+    chosen = np.flatnonzero(certain)
+    if slots:
+        cumulative = np.concatenate(([0.0], np.cumsum(np.where(certain, 0.0, sizes))))
+        step = rest_total / slots
+        points = rng.random() * step + step * np.arange(slots)
+        picked = np.searchsorted(cumulative, points, side="right") - 1
+        chosen = np.sort(np.concatenate([chosen, np.minimum(picked, len(sizes) - 1)]))
+    return chosen, pi[chosen]
+
+
+def pps_systematic_positions(pps, n_h, seed=None):
+    """Systematic PPS selection of n_h units per stratum on the size measure.
+
+    One random start per stratum, step X_h / n_h, and a binary search of all
+    selection points in the cumulative sizes: O(n log N) once `pps` is built.
+    `n_h` is a Series indexed by stratum label, or an int for an unstratified
+    frame. Returns (frame row positions, inclusion probabilities pi_i).
+    """
+    rng = np.random.default_rng(seed)
+    index = pps.index
+    if np.isscalar(n_h):
+        n_h = pd.Series([n_h], index=index.keys)
+    ids = index.stratum_ids(n_h.index)
+    counts = np.zeros(len(index.keys), dtype=np.int64)
+    counts[ids] = np.asarray(n_h, dtype=np.int64)
+    if np.any(counts < 0) or np.any(counts > index.sizes):
+        raise ValueError("Stratum sample sizes must be between 0 and the stratum size.")
+
+    totals = pps.totals
+    active = np.flatnonzero(counts > 0)
+    step = np.zeros(len(counts))
+    step[active] = totals[active] / counts[active]
+    # Strata whose largest unit exceeds the step need certainty selections.
+    special = active[pps.largest[active] >= step[active]]
+    regular = np.setdiff1d(active, special, assume_unique=True)
+
+    reg_counts = counts[regular]
+    strata = np.repeat(regular, reg_counts)
+    starts = np.repeat(np.cumsum(reg_counts) - reg_counts, reg_counts)
+    j = np.arange(len(strata)) - starts
+    random_starts = rng.random(len(regular)) * step[regular]
+    points = (
+        pps.cumulative[index.offsets[strata]]
+        + np.repeat(random_starts, reg_counts)
+        + j * step[strata]
+    )
+    selected = np.searchsorted(pps.cumulative, points, side="right") - 1
+    # Guard against rounding pushing a point past the end of its stratum.
+    selected = np.clip(selected, index.offsets[strata], index.offsets[strata + 1] - 1)
+    pi = counts[strata] * pps.sizes[selected] / totals[strata]
+
+    extra_selected, extra_pi = [selected], [pi]
+    for h in special:
+        lo, hi = index.offsets[h], index.offsets[h + 1]
+        local, local_pi = _systematic_with_certainty(pps.sizes[lo:hi], int(counts[h]), rng)
+        extra_selected.append(lo + local)
+        extra_pi.append(local_pi)
+    selected = np.concatenate(extra_selected)
+    pi = np.concatenate(extra_pi)
+    order = np.argsort(selected, kind="stable")
+    return index.positions[selected[order]], pi[order]
+
+
+def srs_index_matrix(N, n, R, rng):
+    """R independent SRSWOR samples of n positions in range(N), as an R x n matrix (rows sorted).
+
+    Sparse case (n <= N / 2): positions are drawn with replacement and only the
+    duplicates of each row are redrawn, O(R n log n). Dense case: the n
+    smallest of N random keys per row, O(R N).
+    """
+    if n < 0 or n > N:
+        raise ValueError(f"Sample size must be between 0 and {N} (got {n}).")
+    if 2 * n > N:
+        keys = rng.random((R, N))
+        return np.sort(np.argpartition(keys, n - 1, axis=1)[:, :n], axis=1) if n else np.empty((R, 0), dtype=np.int64)
+    draws = rng.integers(0, N, size=(R, n))
+    while True:
+        draws.sort(axis=1)
+        duplicate = np.zeros(draws.shape, dtype=bool)
+        duplicate[:, 1:] = draws[:, 1:] == draws[:, :-1]
+        n_duplicates = int(duplicate.sum())
+        if n_duplicates == 0:
+            return draws
+        draws[duplicate] = rng.integers(0, N, size=n_duplicates)
+
+
+def with_design(df, positions, pi):
+    """Rows at `positions` with their inclusion probabilities and design weights."""
+    pi = np.broadcast_to(np.asarray(pi, dtype=np.float64), (len(positions),))
+    return df.take(positions).assign(**{PI_COLUMN: pi, WEIGHT_COLUMN: 1.0 / pi})
+
+
+def draw_sas(df, n, seed=None):
+    """SRSWOR sample of n rows (pi_i = n / N), in frame order."""
+    rng = np.random.default_rng(seed)
+    positions = np.sort(rng.choice(len(df), size=n, replace=False))
+    return with_design(df, positions, n / len(df))
+
+
+def draw_stratified(df, index, n_h, seed=None):
+    """Stratified SRSWOR sample (pi_i = n_h / N_h) for the allocation `n_h` over `index`."""
+    positions = stratified_positions(index, n_h, seed=seed)
+    counts = np.zeros(len(index.keys), dtype=np.int64)
+    counts[index.stratum_ids(n_h.index)] = np.asarray(n_h, dtype=np.int64)
+    # Positions come back grouped by stratum in index order, so strata can be read off the counts.
+    strata = np.repeat(np.arange(len(counts)), counts)
+    return with_design(df, positions, counts[strata] / index.sizes[strata])
+
+
+def draw_pps(df, pps, n_h, seed=None):
+    """Systematic PPS sample on the size measure of `pps` (pi_i from `pps_systematic_positions`)."""
+    positions, pi = pps_systematic_positions(pps, n_h, seed=seed)
+    return with_design(df, positions, pi)
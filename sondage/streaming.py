@@ -0,0 +1,155 @@
+"""Out-of-core sampling: exact SAS and stratified draws over a frame read in chunks.
+
+Each row gets an independent uniform key and every reservoir keeps the rows
+with the smallest keys, which is an exact SRSWOR of its size. A stratified
+draw keeps one reservoir per stratum, sized by an allocation computed from a
+first pass that only aggregates stratum totals. Peak memory is one chunk plus
+the reservoirs (n rows), whatever the number of rows N in the frame.
+
+CSV frames are read as UTF-8; a pass that hits a decoding error is rerun
+from the start as latin1, and the encoding found is reused by the next pass,
+so a UTF-8 file is never read more often than the passes require.
+"""
+import warnings
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from sondage.allocation import allocation_table
+from sondage.frame import optimize_dtypes
+from sondage.sampling import PI_COLUMN, WEIGHT_COLUMN
+
+DEFAULT_CHUNKSIZE = 100_000
+
+
+def _with_encoding_fallback(source, read_pass, encoding="utf-8"):
+    """Runs `read_pass(encoding)`; reruns it as latin1 if UTF-8 decoding fails. Returns (result, encoding)."""
+    try:
+        return read_pass(encoding), encoding
+    except UnicodeDecodeError:
+        if encoding != "utf-8":
+            raise
+        warnings.warn(f"UTF-8 decoding failed for {source}. Trying 'latin1' encoding.")
+        return read_pass("latin1"), "latin1"
+
+
+def iter_frame_chunks(source, chunksize=DEFAULT_CHUNKSIZE, columns=None, encoding="utf-8"):
+    """Yields the frame as DataFrames of at most `chunksize` rows, from a CSV (in `encoding`) or a Parquet store.
+
+    Chunk indexes are global row positions, so rows keep their frame position.
+    """
+    start = 0
+    if Path(source).suffix == ".parquet":
+        import pyarrow.parquet as pq
+
+        batches = (
+            batch.to_pandas()
+            for batch in pq.ParquetFile(source).iter_batches(batch_size=chunksize, columns=columns)
+        )
+    else:
+        batches = pd.read_csv(source, encoding=encoding, chunksize=chunksize, usecols=columns)
+    for chunk in batches:
+        chunk.index = pd.RangeIndex(start, start + len(chunk))
+        start += len(chunk)
+        yield optimize_dtypes(chunk)
+
+
+def frame_columns(source):
+    """Column names of a CSV or Parquet frame, read from its header only."""
+    if Path(source).suffix == ".parquet":
+        import pyarrow.parquet as pq
+
+        return pq.read_schema(source).names
+    columns, _ = _with_encoding_fallback(source, lambda enc: list(pd.read_csv(source, encoding=enc, nrows=0).columns))
+    return columns
+
+
+def stream_stratum_totals(source, strat_var, size_col="pop_block", variability_col="pop_block",
+                          chunksize=DEFAULT_CHUNKSIZE, encoding="utf-8"):
+    """First pass: per-stratum block count, size total and standard deviation (same layout as `stratum_totals`)."""
+    columns = list(dict.fromkeys([strat_var, size_col, variability_col]))
+    parts = []
+    for chunk in iter_frame_chunks(source, chunksize=chunksize, columns=columns, encoding=encoding):
+        values = chunk[variability_col].astype(np.float64)
+        parts.append(pd.DataFrame({
+            "blocks": 1,
+            "size": chunk[size_col].astype(np.float64),
+            "sum": values,
+            "sum_sq": values * values,
+        }).groupby(chunk[strat_var].astype(object).to_numpy()).sum())
+    acc = pd.concat(parts).groupby(level=0).sum().sort_index()
+    acc.index.name = strat_var
+    with np.errstate(divide="ignore", invalid="ignore"):
+        variance = (acc["sum_sq"] - acc["sum"] ** 2 / acc["blocks"]) / (acc["blocks"] - 1)
+    return pd.DataFrame({
+        "blocks": acc["blocks"].astype(np.int64),
+        "size": acc["size"],
+        "sd": np.sqrt(variance.clip(lower=0)).fillna(0.0),
+    })
+
+
+def _keep_smallest(reservoir, keys, strata, capacity):
+    """Rows of `reservoir` whose key ranks below their stratum's capacity."""
+    order = np.lexsort((keys, strata))
+    sorted_strata = strata[order]
+    group_start = np.flatnonzero(np.r_[True, sorted_strata[1:] != sorted_strata[:-1]])
+    group_len = np.diff(np.r_[group_start, len(order)])
+    rank = np.arange(len(order)) - np.repeat(group_start, group_len)
+    keep = order[rank < capacity[sorted_strata]]
+    return reservoir.iloc[keep], keys[keep], strata[keep]
+
+
+def _reservoir_pass(source, capacity, labels, strat_var, rng, chunksize, columns, encoding):
+    """Draw pass: keeps the `capacity[h]` smallest-key rows of every stratum; returns (reservoir, strata, population)."""
+    reservoir, keys, strata = None, np.empty(0), np.empty(0, dtype=np.int64)
+    population = np.zeros(len(capacity), dtype=np.int64)
+    for chunk in iter_frame_chunks(source, chunksize=chunksize, columns=columns, encoding=encoding):
+        if labels is None:
+            chunk_strata = np.zeros(len(chunk), dtype=np.int64)
+        else:
+            chunk_strata = labels.get_indexer(chunk[strat_var].astype(object))
+            chunk = chunk[chunk_strata >= 0]
+            chunk_strata = chunk_strata[chunk_strata >= 0]
+        population += np.bincount(chunk_strata, minlength=len(capacity))
+        chunk_keys = rng.random(len(chunk))
+        reservoir = chunk if reservoir is None else pd.concat([reservoir, chunk])
+        keys = np.concatenate([keys, chunk_keys])
+        strata = np.concatenate([strata, chunk_strata])
+        reservoir, keys, strata = _keep_smallest(reservoir, keys, strata, capacity)
+    return reservoir, strata, population
+
+
+def stream_sample(source, n, strat_var=None, allocation="proportional", chunksize=DEFAULT_CHUNKSIZE,
+                  seed=None, columns=None, min_per_stratum=0):
+    """Exact SAS (strat_var=None) or stratified SRSWOR sample read in chunks.
+
+    Returns the sample in frame order, indexed by frame row position, with
+    `pi` and `weight` columns. A stratified draw makes two passes over
+    `source`: one for the stratum totals (allocation), one for the draw.
+    """
+    encoding = "utf-8"
+    if strat_var is None:
+        capacity = np.array([n], dtype=np.int64)
+        labels = None
+    else:
+        totals, encoding = _with_encoding_fallback(source, lambda enc: stream_stratum_totals(
+            source, strat_var, chunksize=chunksize, encoding=enc
+        ))
+        table = allocation_table(totals, n, allocation, min_per_stratum=min_per_stratum)
+        capacity = table["n_h"].to_numpy(dtype=np.int64)
+        labels = pd.Index(table.index)
+        if columns is not None and strat_var not in columns:
+            columns = [strat_var, *columns]
+
+    # A rerun restarts the random stream, so the sample does not depend on the encoding fallback.
+    (reservoir, strata, population), _ = _with_encoding_fallback(source, lambda enc: _reservoir_pass(
+        source, capacity, labels, strat_var, np.random.default_rng(seed), chunksize, columns, enc
+    ), encoding)
+    if reservoir is None:
+        raise ValueError(f"No rows read from {source}.")
+    if np.any(capacity > population):
+        raise ValueError(f"Sample size n={n} exceeds the number of rows in the frame ({int(population.sum())}).")
+    pi = capacity[strata] / population[strata]
+    sample = reservoir.assign(**{PI_COLUMN: pi, WEIGHT_COLUMN: 1.0 / pi})
+    return sample.sort_index()
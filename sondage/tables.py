@@ -0,0 +1,50 @@
+"""Result tables shared by the app and the CLI (labels match the app's downloads)."""
+import numpy as np
+import pandas as pd
+
+from sondage.sampling import DESIGN_COLUMNS
+
+# Identifiers and running totals that are not meaningful as study variables.
+CODE_COLUMNS_PREFIX = "CODE"
+NON_STUDY_COLUMNS = ["CODE GOUV", "CODE DELEG", "CODE SECTOR", "CODE BLOCK", "Block", "Cumulative population"]
+MAX_COMPARISON_CARDINALITY = 50
+
+
+def is_comparison_candidate(col, cardinality, dtype):
+    """Whether a column can be compared between sample and frame (few categories or non-numeric)."""
+    return (
+        (cardinality < MAX_COMPARISON_CARDINALITY or not pd.api.types.is_numeric_dtype(dtype))
+        and col not in NON_STUDY_COLUMNS
+    )
+
+
+def descriptive_stats(sample):
+    """`describe()` of the numeric study variables (no codes, running totals or design columns), or None."""
+    cols = [
+        col for col in sample.select_dtypes(include=np.number).columns
+        if not col.startswith(CODE_COLUMNS_PREFIX) and col not in NON_STUDY_COLUMNS and col not in DESIGN_COLUMNS
+    ]
+    return sample[cols].describe() if cols else None
+
+
+def frame_proportions(df, var):
+    """Frame distribution of `var` in percent, labelled for the comparison table."""
+    return df[var].value_counts(normalize=True).mul(100).round(2).rename("Proportion Cadre (%)")
+
+
+def comparison_table(sample, var, frame_props):
+    """Sample vs frame proportions (%) of `var`, sorted by sample proportion."""
+    props_sample = sample[var].value_counts(normalize=True).mul(100).round(2).rename("Proportion Échantillon (%)")
+    comparison_df = pd.concat([props_sample, frame_props], axis=1).fillna(0)
+    comparison_df.index.name = var
+    return comparison_df
+
+
+def allocation_report(allocation):
+    """Allocation table with the app's column labels."""
+    return pd.DataFrame({
+        'Population Strate (N_h)': allocation['size'],
+        'Poids Strate (W_h %)': (allocation['weight'] * 100).round(2),
+        'Allocation Théorique (n*W_h)': allocation['n_theoretical'].round(3),
+        'Allocation Ajustée (n_h)': allocation['n_h'],
+    })
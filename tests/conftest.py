@@ -0,0 +1,17 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+
+@pytest.fixture
+def toy_frame():
+    """40 blocks in 3 unequal strata, with the columns the designs and estimators read."""
+    rng = np.random.default_rng(2024)
+    strata = np.repeat(["A", "B", "C"], [12, 8, 20])
+    pop = rng.integers(20, 400, size=len(strata)).astype(np.float32)
+    return pd.DataFrame({
+        "Region": pd.Categorical(strata),
+        "Area": pd.Categorical(rng.choice(["Rural", "Urban"], size=len(strata))),
+        "pop_block": pop,
+        "Lodging": (pop / 4).round().astype(np.float32),
+    })
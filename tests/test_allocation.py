@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+
+from sondage.allocation import AllocationError, allocate, allocate_frame, allocate_with_minimum, empty_strata
+
+
+def test_allocate_sums_to_n_within_caps():
+    rng = np.random.default_rng(0)
+    for _ in range(500):
+        H = int(rng.integers(1, 25))
+        caps = rng.integers(0, 40, size=H)
+        weights = rng.random(H) * (rng.random(H) > 0.2)
+        n = int(rng.integers(0, caps.sum() + 1))
+        n_h, target = allocate(weights, n, caps)
+        assert n_h.sum() == n
+        assert np.all(n_h <= caps)
+        assert np.all(np.abs(n_h - target) < 1)
+
+
+def test_allocate_is_proportional_when_no_cap_binds():
+    n_h, _ = allocate([0.5, 0.3, 0.2], 10, [100, 100, 100])
+    assert n_h.tolist() == [5, 3, 2]
+
+
+def test_allocate_spreads_the_excess_of_capped_strata():
+    n_h, _ = allocate([0.8, 0.1, 0.1], 10, [2, 100, 100])
+    assert n_h.tolist() == [2, 4, 4]
+
+
+def test_allocate_raises_when_n_exceeds_capacity():
+    with pytest.raises(AllocationError):
+        allocate([0.5, 0.5], 11, [5, 5])
+
+
+def test_allocate_with_minimum_keeps_every_stratum():
+    weights = np.array([0.9, 0.05, 0.03, 0.02])
+    caps = np.array([100, 100, 1, 100])
+    plain, _ = allocate(weights, 10, caps)
+    assert plain.min() == 0
+    n_h, _ = allocate_with_minimum(weights, 10, caps, minimum=2)
+    assert n_h.sum() == 10
+    assert n_h.tolist()[1:] == [2, 1, 2]
+
+
+def test_allocate_with_minimum_raises_when_n_is_below_the_minimum():
+    with pytest.raises(AllocationError):
+        allocate_with_minimum([0.5, 0.3, 0.2], 2, [10, 10, 10], minimum=1)
+
+
+def test_empty_strata(toy_frame):
+    table = allocate_frame(toy_frame, "Region", 2)
+    assert len(empty_strata(table)) == 1
+    assert len(empty_strata(allocate_frame(toy_frame, "Region", 3, min_per_stratum=1))) == 0
@@ -0,0 +1,53 @@
+import tempfile
+import zipfile
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from sondage.batch import design_grid, open_shared_frame, run_batch, share_frame, write_batch
+from sondage.estimation import EmptyStrataWarning
+
+
+def test_design_grid_skips_meaningless_combinations():
+    designs = design_grid(["sas", "strat", "pps"], [None, "Region"], [5, 10], [1])
+    methods = [(d.method, d.strat_var) for d in designs]
+    assert methods.count(("sas", None)) == 2
+    assert ("strat", None) not in methods
+    assert methods.count(("pps", None)) == 2 and methods.count(("pps", "Region")) == 2
+
+
+def test_shared_frame_is_memory_mapped(toy_frame):
+    with tempfile.TemporaryDirectory() as directory:
+        shared = open_shared_frame(share_frame(toy_frame, ["Region", "pop_block"], directory))
+        pd.testing.assert_frame_equal(shared, toy_frame[["Region", "pop_block"]])
+        values = shared["pop_block"].to_numpy()
+        while not isinstance(values, np.memmap):
+            values = values.base
+        assert not values.flags.writeable
+
+
+@pytest.mark.filterwarnings("ignore::sondage.estimation.SingletonStrataWarning")
+def test_executors_give_identical_tables(toy_frame, tmp_path):
+    designs = design_grid(["sas", "strat", "pps"], [None, "Region"], [6, 12], [1, 2])
+    serial = run_batch(toy_frame, designs)
+    threads = run_batch(toy_frame, designs, workers=2, executor="thread")
+    processes = run_batch(toy_frame, designs, workers=2, executor="process")
+    for name in serial._fields:
+        pd.testing.assert_frame_equal(getattr(serial, name), getattr(threads, name))
+        pd.testing.assert_frame_equal(getattr(serial, name), getattr(processes, name), check_dtype=False)
+    assert len(serial.designs) == len(designs)
+    with zipfile.ZipFile(write_batch(serial, tmp_path / "plans.zip")) as archive:
+        assert sorted(archive.namelist()) == sorted(f"{name}.csv" for name in serial._fields)
+
+
+@pytest.mark.filterwarnings("ignore::sondage.estimation.SingletonStrataWarning")
+def test_designs_table_counts_empty_and_singleton_strata(toy_frame):
+    designs = design_grid(["strat"], ["Region"], [2, 6], [1])
+    designs += design_grid(["strat"], ["Region"], [6], [1], min_per_stratum=2)
+    with pytest.warns(EmptyStrataWarning):
+        result = run_batch(toy_frame, designs)
+    assert result.designs["min_per_stratum"].tolist() == [0, 0, 2]
+    assert result.designs["empty_strata"].tolist() == [1, 0, 0]
+    assert result.designs["singleton_strata"].iloc[0] == 2
+    assert result.designs["singleton_strata"].iloc[2] == 0
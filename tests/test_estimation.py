@@ -0,0 +1,48 @@
+import numpy as np
+import pytest
+
+from sondage.design import draw
+from sondage.estimation import EmptyStrataWarning, SingletonStrataWarning, ht_means, ht_totals, singleton_strata
+
+
+def test_sas_total_and_se_match_the_srswor_formula(toy_frame):
+    n, N = 10, len(toy_frame)
+    sample, _ = draw(toy_frame, "sas", n, seed=5)
+    y = sample["pop_block"].to_numpy(dtype=np.float64)
+    result = ht_totals(sample, ["pop_block"]).loc["pop_block"]
+    assert result["estimate"] == pytest.approx(N * y.mean())
+    assert result["se"] == pytest.approx(np.sqrt(N ** 2 * (1 - n / N) * y.var(ddof=1) / n))
+    assert result["n"] == n
+
+
+def test_stratified_se_sums_the_stratum_variances(toy_frame):
+    sample, table = draw(toy_frame, "strat", 12, strat_var="Region", seed=2)
+    variance = 0.0
+    for label, rows in sample.groupby("Region", observed=True):
+        N_h, n_h = table.loc[label, "blocks"], table.loc[label, "n_h"]
+        variance += N_h ** 2 * (1 - n_h / N_h) * rows["pop_block"].astype(np.float64).var(ddof=1) / n_h
+    result = ht_totals(sample, ["pop_block"], strata="Region").loc["pop_block"]
+    assert result["se"] == pytest.approx(np.sqrt(variance))
+
+
+def test_mean_of_a_constant_is_exact(toy_frame):
+    sample, _ = draw(toy_frame, "pps", 8, seed=4)
+    sample = sample.assign(one=1.0)
+    result = ht_means(sample, ["one"]).loc["one"]
+    assert result["estimate"] == pytest.approx(1.0)
+    assert result["se"] == pytest.approx(0.0, abs=1e-12)
+
+
+@pytest.mark.filterwarnings("ignore::sondage.estimation.SingletonStrataWarning")
+def test_warns_about_frame_strata_without_sampled_units(toy_frame):
+    sample, table = draw(toy_frame, "strat", 2, strat_var="Region", seed=0)
+    with pytest.warns(EmptyStrataWarning):
+        ht_totals(sample, ["pop_block"], strata="Region", frame_strata=table.index)
+
+
+def test_warns_about_strata_with_a_single_sampled_unit(toy_frame):
+    sample, _ = draw(toy_frame, "strat", 4, strat_var="Region", seed=0, min_per_stratum=1)
+    with pytest.warns(SingletonStrataWarning):
+        ht_totals(sample, ["pop_block"], strata="Region")
+    sample, _ = draw(toy_frame, "strat", 6, strat_var="Region", seed=0, min_per_stratum=2)
+    assert len(singleton_strata(sample, "Region")) == 0
@@ -0,0 +1,67 @@
+import json
+import os
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from sondage import frame
+from sondage.frame import load_frame, store_path
+
+
+@pytest.fixture
+def csv_frame(toy_frame, tmp_path):
+    path = tmp_path / "cadre.csv"
+    toy_frame.assign(pop_block=toy_frame["pop_block"].astype(int)).to_csv(path, index=False)
+    return path
+
+
+@pytest.fixture
+def csv_parses(monkeypatch):
+    calls = []
+    read_csv = frame._read_csv
+
+    def counting_read_csv(*args, **kwargs):
+        calls.append(args)
+        return read_csv(*args, **kwargs)
+
+    monkeypatch.setattr(frame, "_read_csv", counting_read_csv)
+    return calls
+
+
+def test_store_survives_an_mtime_only_change(csv_frame, csv_parses):
+    first = load_frame(csv_frame)
+    assert len(csv_parses) == 1
+    stat = os.stat(csv_frame)
+    os.utime(csv_frame, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    pd.testing.assert_frame_equal(load_frame(csv_frame), first)
+    assert len(csv_parses) == 1
+    meta = json.loads(store_path(csv_frame).with_suffix(".json").read_text())
+    assert meta["mtime_ns"] == os.stat(csv_frame).st_mtime_ns
+
+
+def test_store_is_rebuilt_when_same_size_content_changes(csv_frame, csv_parses):
+    load_frame(csv_frame)
+    text = csv_frame.read_text()
+    header, first_row, rest = text.split("\n", 2)
+    digit = next(ch for ch in reversed(first_row) if ch.isdigit())
+    changed = first_row[::-1].replace(digit, str((int(digit) + 1) % 10), 1)[::-1]
+    stat = os.stat(csv_frame)
+    csv_frame.write_text("\n".join([header, changed, rest]))
+    os.utime(csv_frame, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert os.stat(csv_frame).st_size == stat.st_size
+    reloaded = load_frame(csv_frame)
+    assert len(csv_parses) == 2
+    pd.testing.assert_frame_equal(reloaded, frame.read_frame_csv(csv_frame))
+
+
+def test_unwritable_store_parses_the_csv_once(csv_frame, csv_parses, monkeypatch):
+    def read_only(self, *args, **kwargs):
+        raise PermissionError(f"read-only: {self}")
+
+    monkeypatch.setattr(Path, "mkdir", read_only)
+    with pytest.warns(UserWarning, match="Could not write the frame store"):
+        df = load_frame(csv_frame)
+    assert len(csv_parses) == 1
+    assert len(df) == 40
+    assert not store_path(csv_frame).exists()
@@ -0,0 +1,54 @@
+import tracemalloc
+
+import numpy as np
+
+from sondage.instrument import Profiler, add_worker_cpu, cpu_timed, profiling, prometheus_text, stage
+
+
+def test_stages_nest_and_pass_worker_cpu_to_their_parents():
+    with profiling(Profiler(memory=True)) as profiler:
+        with stage("test_outer", rows=5):
+            with stage("test_inner") as handle:
+                handle.rows = 3
+                add_worker_cpu(2.0)
+            with stage("test_sibling"):
+                pass
+    records = profiler.to_frame().set_index("stage")
+    assert records.index.tolist() == ["test_outer", "test_outer/test_inner", "test_outer/test_sibling"]
+    assert records.loc["test_outer/test_inner", "rows"] == 3
+    assert records.loc["test_outer/test_inner", "cpu_s"] >= 2.0
+    assert records.loc["test_outer/test_sibling", "cpu_s"] < 2.0
+    assert records.loc["test_outer", "cpu_s"] >= records.loc["test_outer/test_inner", "cpu_s"]
+
+
+def test_peak_memory_is_relative_and_reaches_the_parent():
+    with profiling(Profiler(memory=True)) as profiler:
+        with stage("test_memory_outer"):
+            with stage("test_memory_inner"):
+                block = np.ones(4 * 2**20 // 8)
+                del block
+    assert not tracemalloc.is_tracing()
+    peaks = profiler.to_frame().set_index("stage")["peak_mib"]
+    assert peaks["test_memory_outer/test_memory_inner"] >= 4
+    assert peaks["test_memory_outer"] >= peaks["test_memory_outer/test_memory_inner"]
+
+
+def test_stages_are_not_recorded_without_a_profiler():
+    with stage("test_unprofiled") as handle:
+        handle.rows = 1
+    assert 'stage="test_unprofiled"' not in prometheus_text()
+
+
+def test_prometheus_text_exports_the_stage_totals():
+    result, cpu = cpu_timed(sum)(range(1000))
+    assert result == 499500 and cpu >= 0
+    with profiling(Profiler()):
+        for _ in range(2):
+            with stage("test_prometheus", rows=10):
+                add_worker_cpu(1.5)
+    lines = prometheus_text().splitlines()
+    assert "# TYPE sondage_stage_calls_total counter" in lines
+    assert 'sondage_stage_calls_total{stage="test_prometheus"} 2' in lines
+    assert 'sondage_stage_rows_total{stage="test_prometheus"} 20' in lines
+    cpu_line = next(line for line in lines if line.startswith('sondage_stage_cpu_seconds_total{stage="test_prometheus"}'))
+    assert float(cpu_line.split()[-1]) >= 3.0
@@ -0,0 +1,35 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from sondage.estimation import EmptyStrataWarning
+from sondage.replication import design_arrays, replicate_estimates, replication_summary
+
+
+def test_replicates_do_not_depend_on_the_number_of_workers(toy_frame):
+    serial = replicate_estimates(toy_frame, 10, strat_var="Region", R=1200, seed=3, batch_size=500)
+    pooled = replicate_estimates(toy_frame, 10, strat_var="Region", R=1200, seed=3, batch_size=500, workers=2)
+    pd.testing.assert_frame_equal(serial, pooled)
+
+
+def test_batch_size_sets_the_random_streams(toy_frame):
+    # Each batch draws from its own child of the seed, so the split into batches is part of the seed.
+    a = replicate_estimates(toy_frame, 10, R=1000, seed=3, batch_size=300)
+    b = replicate_estimates(toy_frame, 10, R=1000, seed=3, batch_size=300)
+    c = replicate_estimates(toy_frame, 10, R=1000, seed=3, batch_size=1000)
+    pd.testing.assert_frame_equal(a, b)
+    assert len(a) == len(c) == 1000
+    assert not a.equals(c)
+    np.testing.assert_allclose(a.mean(), c.mean(), rtol=0.02)
+
+
+def test_sas_design_effect_is_close_to_one(toy_frame):
+    estimates = replicate_estimates(toy_frame, 10, R=4000, seed=1)
+    summary = replication_summary(estimates, toy_frame, 10)
+    np.testing.assert_allclose(summary["deff"], 1.0, atol=0.1)
+    np.testing.assert_allclose(summary["bias"] / summary["true_mean"], 0.0, atol=0.01)
+
+
+def test_design_arrays_warns_about_strata_without_units(toy_frame):
+    with pytest.warns(EmptyStrataWarning):
+        design_arrays(toy_frame, 2, strat_var="Region")
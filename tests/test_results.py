@@ -0,0 +1,65 @@
+import os
+
+import pytest
+
+from sondage.results import DrawKey, ResultStore
+
+KEY_A = DrawKey("v1", "sas", 10, seed=1)
+KEY_B = DrawKey("v1", "sas", 10, seed=2)
+
+
+def write_text(path):
+    with open(path, "w", encoding="utf-8") as fh:
+        fh.write("x")
+
+
+def test_eviction_removes_the_artifact_files(tmp_path):
+    store = ResultStore(maxsize=1, directory=str(tmp_path))
+    store.get_or_compute(KEY_A, lambda: "a")
+    path = store.artifact(KEY_A, "sample.csv", write_text)
+    assert os.path.exists(path)
+    assert store.artifact(KEY_A, "sample.csv", pytest.fail) == path
+    store.get_or_compute(KEY_B, lambda: "b")
+    assert len(store) == 1
+    assert not os.path.exists(path)
+    assert store.artifact_path(KEY_A, "sample.csv") is None
+
+
+def test_artifact_of_an_evicted_result_leaves_no_file(tmp_path):
+    store = ResultStore(maxsize=1, directory=str(tmp_path))
+    assert store.artifact(KEY_A, "sample.csv", write_text) is None
+    store.get_or_compute(KEY_A, lambda: "a")
+
+    def evicting_write(path):
+        write_text(path)
+        store.get_or_compute(KEY_B, lambda: "b")
+
+    assert store.artifact(KEY_A, "sample.csv", evicting_write) is None
+    assert os.listdir(tmp_path) == []
+
+
+def test_second_writer_of_an_artifact_keeps_the_first_file(tmp_path):
+    store = ResultStore(directory=str(tmp_path))
+    store.get_or_compute(KEY_A, lambda: "a")
+    first = []
+
+    def racing_write(path):
+        write_text(path)
+        first.append(store.artifact(KEY_A, "sample.csv", write_text))
+
+    assert store.artifact(KEY_A, "sample.csv", racing_write) == first[0]
+    assert os.listdir(tmp_path) == [os.path.basename(first[0])]
+
+
+def test_failed_write_leaves_no_file(tmp_path):
+    store = ResultStore(directory=str(tmp_path))
+    store.get_or_compute(KEY_A, lambda: "a")
+
+    def failing_write(path):
+        write_text(path)
+        raise RuntimeError("disk full")
+
+    with pytest.raises(RuntimeError):
+        store.artifact(KEY_A, "sample.csv", failing_write)
+    assert os.listdir(tmp_path) == []
+    assert store.artifact_path(KEY_A, "sample.csv") is None
@@ -0,0 +1,116 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from sondage.allocation import allocate_frame
+from sondage.design import draw
+from sondage.multistage import Stage, build_hierarchy_index, multistage_positions
+from sondage.sampling import build_pps_frame, build_stratum_index, pps_systematic_positions, stratified_positions
+from sondage.streaming import stream_sample
+
+DRAWS = 4000
+
+
+def inclusion_frequencies(select, N, draws=DRAWS):
+    counts = np.zeros(N)
+    for seed in range(draws):
+        counts[select(seed)] += 1
+    return counts / draws
+
+
+def test_stratified_inclusion_frequencies_match_pi(toy_frame):
+    index = build_stratum_index(toy_frame, "Region")
+    n_h = pd.Series([3, 2, 5], index=["A", "B", "C"])
+    freq = inclusion_frequencies(lambda seed: stratified_positions(index, n_h, seed=seed), len(toy_frame))
+    _, table = draw(toy_frame, "strat", 10, strat_var="Region", seed=0)
+    pi = (n_h / table["blocks"]).reindex(toy_frame["Region"]).to_numpy()
+    np.testing.assert_allclose(freq, pi, atol=0.035)
+
+
+def test_pps_certainty_unit_and_inclusion_frequencies():
+    sizes = np.array([400.0, 5, 30, 12, 60, 8, 25, 45, 3, 70, 18, 24])
+    frame = pd.DataFrame({"pop_block": sizes})
+    pps = build_pps_frame(frame)
+    n = 4
+    positions, pi = pps_systematic_positions(pps, n, seed=1)
+    assert len(positions) == n
+    pi_by_unit = dict(zip(positions, pi))
+    assert pi_by_unit[0] == 1.0
+    # Exact pi_i: the certainty unit, then n - 1 units proportional to size among the others.
+    expected = np.r_[1.0, (n - 1) * sizes[1:] / sizes[1:].sum()]
+    assert expected.max() <= 1
+    for unit, value in pi_by_unit.items():
+        assert value == pytest.approx(expected[unit])
+    freq = inclusion_frequencies(lambda seed: pps_systematic_positions(pps, n, seed=seed)[0], len(sizes))
+    np.testing.assert_allclose(freq, expected, atol=0.035)
+    assert expected.sum() == pytest.approx(n)
+
+
+def test_stratified_pps_takes_n_h_per_stratum_with_pi_proportional_to_size(toy_frame):
+    sample, table = draw(toy_frame, "pps", 9, strat_var="Region", seed=3)
+    counts = sample["Region"].value_counts().reindex(table.index)
+    np.testing.assert_array_equal(counts, table["n_h"])
+    stratum = sample["Region"].astype(object)
+    expected = (
+        table["n_h"].reindex(stratum).to_numpy() * sample["pop_block"].to_numpy(dtype=np.float64)
+        / table["size"].reindex(stratum).to_numpy()
+    )
+    np.testing.assert_allclose(sample["pi"], expected)
+
+
+def test_draws_are_reproducible(toy_frame):
+    for method, strat_var in (("sas", None), ("strat", "Region"), ("pps", "Region")):
+        a, _ = draw(toy_frame, method, 8, strat_var=strat_var, seed=11)
+        b, _ = draw(toy_frame, method, 8, strat_var=strat_var, seed=11)
+        pd.testing.assert_frame_equal(a, b)
+
+
+def test_stream_reservoir_frequencies_match_the_in_memory_allocation(toy_frame, tmp_path):
+    # Few rows in tiny chunks, so every reservoir is merged across chunk boundaries.
+    frame = toy_frame.groupby("Region", observed=True).head(5).reset_index(drop=True)
+    path = tmp_path / "cadre.csv"
+    frame.to_csv(path, index=False)
+    table = allocate_frame(frame, "Region", 7)
+    pi = (table["n_h"] / table["blocks"]).reindex(frame["Region"].astype(object)).to_numpy()
+
+    def select(seed):
+        sample = stream_sample(path, 7, strat_var="Region", chunksize=6, seed=seed)
+        np.testing.assert_allclose(sample["pi"], pi[sample.index])
+        return sample.index.to_numpy()
+
+    freq = inclusion_frequencies(select, len(frame), draws=400)
+    np.testing.assert_allclose(freq, pi, atol=0.08)
+
+
+def hierarchical_frame(seed=7):
+    """Blocks nested in 3 governorates, 2-3 delegations each and 2-4 sectors per delegation, in shuffled order."""
+    rng = np.random.default_rng(seed)
+    rows = []
+    for gouv in range(1, 4):
+        for deleg in range(1, int(rng.integers(2, 4)) + 1):
+            for sector in range(1, int(rng.integers(2, 5)) + 1):
+                rows += [(gouv, deleg, sector)] * int(rng.integers(2, 6))
+    frame = pd.DataFrame(rows, columns=["CODE GOUV", "CODE DELEG", "CODE SECTOR"])
+    frame["pop_block"] = rng.integers(5, 300, size=len(frame)).astype(np.float32)
+    return frame.sample(frac=1, random_state=seed).reset_index(drop=True)
+
+
+@pytest.mark.parametrize("stages", [
+    [Stage("CODE SECTOR", 6, "pps"), Stage("CODE BLOCK", 2, "srs")],
+    [Stage("CODE GOUV"), Stage("CODE DELEG", 1, "srs"), Stage("CODE SECTOR", 1, "pps")],
+])
+def test_multistage_inclusion_frequencies_match_pi(stages):
+    frame = hierarchical_frame()
+    hierarchy = build_hierarchy_index(frame)
+    pi = np.full(len(frame), np.nan)
+
+    def select(seed):
+        positions, draw_pi = multistage_positions(hierarchy, stages, seed=seed)
+        seen = ~np.isnan(pi[positions])
+        np.testing.assert_allclose(draw_pi[seen], pi[positions][seen])
+        pi[positions] = draw_pi
+        return positions
+
+    freq = inclusion_frequencies(select, len(frame))
+    assert not np.isnan(pi).any()
+    np.testing.assert_allclose(freq, pi, atol=0.035)